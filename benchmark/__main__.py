@@ -0,0 +1,172 @@
+"""Offline throughput benchmark for the description pipeline.
+
+Usage:
+    python -m benchmark [--copies N] [--llm-latency S] [--save-baseline FILE] [--baseline FILE]
+
+Drive is replaced by a local HTTP server, Gemini by a client that sleeps for
+the configured latency, and database.py by an in-memory SQLite stand-in, so
+runs are reproducible and need no credentials or network.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from threading import Thread, Event, Lock
+
+import psutil
+
+from benchmark.corpus import build_corpus
+from benchmark.standins import DriveServer, FakeGenaiClient, SQLiteDatabase, Note
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+class RssSampler:
+    """Polls RSS of this process plus its children (OCR pool) and keeps the peak"""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = Event()
+        self._process = psutil.Process(os.getpid())
+        self._thread = Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                rss = self._process.memory_info().rss
+                for child in self._process.children(recursive=True):
+                    try:
+                        rss += child.memory_info().rss
+                    except psutil.Error:
+                        pass
+                self.peak = max(self.peak, rss)
+            except psutil.Error:
+                pass
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+def instrument(stage, timings, lock):
+    """Wrap a stage function to record the wall time of each call"""
+    func = stage.func
+
+    def timed(item):
+        start = time.perf_counter()
+        try:
+            return func(item)
+        finally:
+            with lock:
+                timings.setdefault(stage.name, []).append(time.perf_counter() - start)
+
+    stage.func = timed
+
+def run(args):
+    # Lift the production quotas; the fake client has no rate limit
+    os.environ.setdefault("LLM_RPM", "1000000")
+    os.environ.setdefault("LLM_TPM", "1000000000")
+
+    corpus = build_corpus(seed=args.seed, copies=args.copies)
+    server = DriveServer(corpus).start()
+    database = SQLiteDatabase(corpus)
+    sys.modules["database"] = database
+
+    import worker
+    import llm
+
+    worker.DRIVE_DOWNLOAD_URL = server.url
+    client = FakeGenaiClient(latency=args.llm_latency, jitter=args.llm_jitter, seed=args.seed)
+    llm._client = client
+
+    timings = {}
+    lock = Lock()
+    for stage in worker.pipeline.stages:
+        instrument(stage, timings, lock)
+
+    sampler = RssSampler().start()
+    start = time.perf_counter()
+    worker.start_worker_if_needed()
+    for file_id, (filename, _) in corpus.items():
+        worker.pipeline.submit(worker.DescriptionJob(Note(file_id, filename)))
+    while worker.pipeline.active:
+        time.sleep(0.05)
+    database.summary_writer.flush()
+    elapsed = time.perf_counter() - start
+    sampler.stop()
+    server.stop()
+
+    results = {
+        "files": len(corpus),
+        "described": database.described(),
+        "elapsed_s": round(elapsed, 3),
+        "files_per_s": round(len(corpus) / elapsed, 3) if elapsed else 0.0,
+        "peak_rss_mb": round(sampler.peak / (1024 * 1024), 1),
+        "llm_calls": client.calls,
+        "stages": {
+            name: {
+                "calls": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p90_ms": round(percentile(values, 90) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "total_s": round(sum(values), 3),
+            }
+            for name, values in timings.items()
+        },
+    }
+    return results
+
+def flatten(results):
+    flat = {key: value for key, value in results.items() if not isinstance(value, dict)}
+    for name, stats in results.get("stages", {}).items():
+        for key, value in stats.items():
+            flat[f"{name}.{key}"] = value
+    return flat
+
+def print_report(results, baseline=None):
+    current = flatten(results)
+    previous = flatten(baseline) if baseline else {}
+    for key, value in current.items():
+        line = f"{key:<24} {value:>12}"
+        if key in previous and isinstance(value, (int, float)) and previous[key]:
+            change = (value - previous[key]) / previous[key] * 100
+            line += f"   baseline {previous[key]:>12}  ({change:+.1f}%)"
+        print(line)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark for the description pipeline")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--copies", type=int, default=3, help="repetitions of the corpus mix")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="seconds per fake LLM call")
+    parser.add_argument("--llm-jitter", type=float, default=0.2)
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--save-baseline", help="write this run's results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    baseline = None
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"[✓] Results saved to {args.save_baseline}")
+
+    # The OCR pool and stage threads are daemons; skip their teardown
+    os._exit(0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Reproducible synthetic corpus of study notes in every supported format."""
+import io
+import random
+import fitz  # PyMuPDF
+from docx import Document
+from pptx import Presentation
+from pptx.util import Inches
+
+VOCABULARY = (
+    "algorithm matrix integral derivative theorem proof lemma vector entropy "
+    "enzyme protein membrane photosynthesis equilibrium reaction molecule "
+    "circuit voltage current resistance transistor amplifier signal frequency "
+    "economics market demand supply inflation capital policy revenue "
+    "history empire revolution treaty constitution parliament colony trade "
+    "question answer explain define describe compare evaluate unit chapter "
+    "exam syllabus lecture notes summary example exercise solution"
+).split()
+
+# (kind, pages/slides/paragraphs) mix; sizes are varied on purpose
+DEFAULT_MIX = [
+    ("pdf", 1), ("pdf", 8), ("pdf", 40),
+    ("scanned_pdf", 1), ("scanned_pdf", 6), ("scanned_pdf", 30),
+    ("docx", 5), ("docx", 60),
+    ("pptx", 4), ("pptx", 80),
+    ("txt", 20), ("txt", 2000),
+]
+
+EXTENSIONS = {
+    "pdf": ".pdf",
+    "scanned_pdf": ".pdf",
+    "docx": ".docx",
+    "pptx": ".pptx",
+    "txt": ".txt",
+}
+
+def words(rng, count):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(count))
+
+def make_pdf(rng, pages):
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 545, 790), words(rng, 350), fontsize=11)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def make_scanned_pdf(rng, pages, dpi=150):
+    """Image-only pages: text is rendered to a raster, so only OCR can read it"""
+    source = fitz.open(stream=make_pdf(rng, pages), filetype="pdf")
+    doc = fitz.open()
+    for src_page in source:
+        pix = src_page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        page = doc.new_page(width=src_page.rect.width, height=src_page.rect.height)
+        page.insert_image(page.rect, stream=pix.tobytes("png"))
+    data = doc.tobytes()
+    doc.close()
+    source.close()
+    return data
+
+def make_docx(rng, paragraphs):
+    doc = Document()
+    for _ in range(paragraphs):
+        doc.add_paragraph(words(rng, 60))
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+def make_pptx(rng, slides):
+    prs = Presentation()
+    layout = prs.slide_layouts[6]
+    for _ in range(slides):
+        slide = prs.slides.add_slide(layout)
+        box = slide.shapes.add_textbox(Inches(0.5), Inches(0.5), Inches(9), Inches(6))
+        box.text_frame.text = words(rng, 40)
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
+def make_txt(rng, lines):
+    return "\n".join(words(rng, 12) for _ in range(lines)).encode("utf-8")
+
+BUILDERS = {
+    "pdf": make_pdf,
+    "scanned_pdf": make_scanned_pdf,
+    "docx": make_docx,
+    "pptx": make_pptx,
+    "txt": make_txt,
+}
+
+def build_corpus(seed=0, copies=1, mix=DEFAULT_MIX):
+    """Returns {file_id: (filename, bytes)}; identical for a given seed"""
+    rng = random.Random(seed)
+    corpus = {}
+    for copy in range(copies):
+        for kind, size in mix:
+            file_id = f"{kind}-{size}-{copy}"
+            filename = f"{file_id}{EXTENSIONS[kind]}"
+            corpus[file_id] = (filename, BUILDERS[kind](rng, size))
+    return corpus
@@ -0,0 +1,196 @@
+"""Local stand-ins for Google Drive, Gemini and the Postgres-backed database module."""
+import time
+import random
+import sqlite3
+from collections import namedtuple
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from threading import Thread, Lock
+from urllib.parse import urlparse, parse_qs
+
+Note = namedtuple("Note", ["file_path", "filename"])
+CacheRow = namedtuple("CacheRow", ["excerpt", "description"])
+
+
+class DriveServer:
+    """Serves corpus bytes at /uc?export=download&id=<file_id>, like Drive does"""
+
+    def __init__(self, corpus, host="127.0.0.1", port=0):
+        files = corpus
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                entry = files.get(query.get("id", [""])[0])
+                if entry is None:
+                    self.send_error(404)
+                    return
+                data = entry[1]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/uc?export=download"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenaiClient:
+    """Mimics client.models.generate_content with configurable latency"""
+
+    def __init__(self, latency=0.8, jitter=0.2, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = Lock()
+        self.calls = 0
+
+    @property
+    def models(self):
+        return self
+
+    def generate_content(self, model, contents):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+        time.sleep(delay)
+        if "### NOTE" in contents:
+            ids = [line.split("### NOTE ", 1)[1].strip()
+                   for line in contents.splitlines() if line.startswith("### NOTE ")]
+            body = ", ".join(f'"{note_id}": "Synthetic description for note {note_id}."' for note_id in ids)
+            return FakeResponse("{" + body + "}")
+        return FakeResponse("Synthetic description of the study material.")
+
+
+class SummaryWriter:
+    def __init__(self, database):
+        self.database = database
+        self._flush_callbacks = []
+
+    def on_flush(self, callback):
+        self._flush_callbacks.append(callback)
+
+    def add(self, summary, drive_file_path):
+        start = time.perf_counter()
+        self.database.save_summaries({drive_file_path: summary})
+        for callback in self._flush_callbacks:
+            callback([drive_file_path], time.perf_counter() - start)
+
+    def pending(self):
+        return 0
+
+    def flush(self):
+        return True
+
+
+class SQLiteDatabase:
+    """In-memory SQLite stand-in exposing the functions worker.py uses from database.py"""
+
+    WORKER_ID = "benchmark"
+
+    def __init__(self, corpus):
+        self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self._lock = Lock()
+        with self._lock:
+            self._conn.execute("CREATE TABLE uploaded_files (file_path TEXT PRIMARY KEY, filename TEXT, description TEXT)")
+            self._conn.execute("CREATE TABLE content_cache (sha256 TEXT PRIMARY KEY, excerpt TEXT, description TEXT)")
+            self._conn.executemany(
+                "INSERT INTO uploaded_files VALUES (?, ?, '')",
+                [(file_id, filename) for file_id, (filename, _) in corpus.items()],
+            )
+            self._conn.commit()
+        self.summary_writer = SummaryWriter(self)
+
+    def _execute(self, query, params=(), fetch=False):
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+            rows = cursor.fetchall() if fetch else None
+            self._conn.commit()
+        return rows
+
+    def ensure_file_path_index(self):
+        return True
+
+    def ensure_job_table(self):
+        return True
+
+    def ensure_upload_trigger(self):
+        return True
+
+    def ensure_content_cache_table(self):
+        return True
+
+    def save_summaries(self, summaries):
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE uploaded_files SET description = ? WHERE file_path = ?",
+                [(summary, file_path) for file_path, summary in summaries.items()],
+            )
+            self._conn.commit()
+        return True
+
+    def enqueue_null_notes(self):
+        return self.count_open_jobs()
+
+    def count_open_jobs(self):
+        return self._execute("SELECT count(*) FROM uploaded_files WHERE description = ''", fetch=True)[0][0]
+
+    def claim_jobs(self, after='', limit=100, lease_seconds=None):
+        rows = self._execute(
+            "SELECT file_path, filename FROM uploaded_files WHERE description = '' AND file_path > ? "
+            "ORDER BY file_path LIMIT ?", (after, limit), fetch=True)
+        return [Note(*row) for row in rows]
+
+    def renew_leases(self, file_paths):
+        return len(file_paths)
+
+    def mark_job_failed(self, drive_file_path, error_class, detail=None, permanent=False,
+                        max_attempts=None):
+        return True
+
+    def save_job_timings(self, drive_file_path, timings):
+        return True
+
+    def job_state_counts(self):
+        return {"queued": self.count_open_jobs(), "done": self.described(), "workers": 1}
+
+    @contextmanager
+    def advisory_lock(self, key, wait=True):
+        yield True
+
+    def get_cached_content(self, sha256):
+        rows = self._execute("SELECT excerpt, description FROM content_cache WHERE sha256 = ?", (sha256,), fetch=True)
+        return CacheRow(*rows[0]) if rows else None
+
+    def save_cached_content(self, sha256, excerpt=None, description=None):
+        self._execute(
+            "INSERT INTO content_cache (sha256, excerpt, description) VALUES (?, ?, ?) "
+            "ON CONFLICT (sha256) DO UPDATE SET excerpt = COALESCE(excluded.excerpt, excerpt), "
+            "description = COALESCE(excluded.description, description)",
+            (sha256, excerpt, description))
+        return True
+
+    def described(self):
+        return self._execute("SELECT count(*) FROM uploaded_files WHERE description != ''", fetch=True)[0][0]
@@ -0,0 +1,61 @@
+"""Cold-start check for the web app and the worker.
+
+Usage:
+    python -m benchmark.startup [--budget-ms MS] [--runs N]
+
+Imports each entry module in a fresh interpreter and fails (exit 1) when
+the best of N import times exceeds the budget, or when the import pulls
+in a backend that should only load on first use.
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ENTRY_MODULES = ("app", "worker")
+# Loaded on demand by the extractor registry, llm.get_client() and the OCR/office pools
+LAZY_MODULES = ("fitz", "docx", "pptx", "PIL", "pytesseract", "tesserocr",
+                "google.genai", "unoserver", "psycopg2")
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "750"))
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+def measure(module, runs):
+    env = dict(os.environ, EMBEDDED_WORKER="0")
+    best = None
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", PROBE.format(module=module, lazy=LAZY_MODULES)],
+                                env=env, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        if best is None or result["ms"] < best["ms"]:
+            best = result
+    return best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fail when import-time startup regresses")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3, help="imports per module; the fastest counts")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in ENTRY_MODULES:
+        result = measure(module, args.runs)
+        line = f"{module:<8} {result['ms']:>8.1f} ms"
+        if result["ms"] > args.budget_ms:
+            line += f"   over budget ({args.budget_ms:.0f} ms)"
+            failed = True
+        if result["loaded"]:
+            line += f"   eagerly imports {', '.join(result['loaded'])}"
+            failed = True
+        print(line)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,13 @@
 from sqlalchemy import create_engine, text
 import os
+import time
+import socket
+import atexit
+import select
+from contextlib import contextmanager
+from threading import Thread, Lock, Event
 from dotenv import load_dotenv
+import metrics
 
 # If running locally, load from .env
 if os.environ.get("RUNNING_IN_DOCKER") != "1":
@@ -13,42 +20,570 @@ db_password = os.environ.get('DB_PASSWORD')
 db_host = os.environ.get('DB_HOST')
 db_name = os.environ.get('DB_NAME')
 
-# Validate
-if not all([db_user, db_password, db_host, db_name]):
-    raise RuntimeError("Missing DB credentials in environment.")
+_engine = None
+_engine_lock = Lock()
 
-if db_user and db_password and db_host and db_name:
-    DB_URL = f"postgresql+psycopg2://{db_user}:{db_password}@{db_host}:5432/{db_name}"
-else:
-    raise RuntimeError("Database credentials are not set in .env. Please set DB_USER, DB_PASSWORD, DB_HOST, DB_NAME.")
-engine = create_engine(DB_URL)
+def get_engine():
+    """Create the engine on first use, so importing this module stays cheap"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            # Validate
+            if not all([db_user, db_password, db_host, db_name]):
+                raise RuntimeError("Database credentials are not set in .env. Please set DB_USER, DB_PASSWORD, DB_HOST, DB_NAME.")
+            _engine = create_engine(
+                f"postgresql+psycopg2://{db_user}:{db_password}@{db_host}:5432/{db_name}",
+                pool_size=int(os.environ.get('DB_POOL_SIZE', '5')),
+                max_overflow=int(os.environ.get('DB_MAX_OVERFLOW', '10')),
+                pool_pre_ping=os.environ.get('DB_POOL_PRE_PING', '1') == '1',
+            )
+        return _engine
 
-# saving the description in the db generated by AI
-def save_summary(summary, drive_file_path):
+# Write-behind batching of descriptions (SummaryWriter -> save_summaries)
+SUMMARY_BATCH_SIZE = int(os.environ.get('SUMMARY_BATCH_SIZE', '50'))
+SUMMARY_FLUSH_INTERVAL = float(os.environ.get('SUMMARY_FLUSH_INTERVAL', '2'))
+
+def save_summaries(summaries):
+    """Save many descriptions in one UPDATE ... FROM (VALUES ...) statement.
+
+    `summaries` maps drive file path -> description.
+    """
+    if not summaries:
+        return True
+    values = []
+    params = {}
+    for i, (drive_file_path, summary) in enumerate(summaries.items()):
+        values.append(f"(:file_path_{i}, :description_{i})")
+        params[f'file_path_{i}'] = drive_file_path
+        params[f'description_{i}'] = summary
+    query = text(f"""UPDATE uploaded_files AS u
+                    SET description = v.description
+                    FROM (VALUES {', '.join(values)}) AS v(file_path, description)
+                    WHERE u.file_path = v.file_path;
+                    """)
+    # Same transaction, so a job is only 'done' once its description is stored
+    # Only jobs this worker still holds: another worker may have re-claimed an expired lease
+    done_query = text("""UPDATE description_jobs
+                    SET state = 'done', claimed_by = NULL, claimed_at = NULL, updated_at = now()
+                    WHERE file_path = ANY(:file_paths) AND claimed_by = :worker_id;
+                    """)
+    start = time.perf_counter()
+    try:
+        with get_engine().connect() as conn:
+            conn.execute(query, params)
+            conn.execute(done_query, {'file_paths': list(summaries), 'worker_id': WORKER_ID})
+            conn.commit()
+        metrics.db_flush_duration.observe(time.perf_counter() - start)
+        metrics.db_flush_rows.inc(len(summaries))
+        return True
+    except Exception as e:
+        print(f"[error] while saving {len(summaries)} summaries : {e}")
+        return False
+
+class SummaryWriter:
+    """Write-behind buffer flushed every SUMMARY_BATCH_SIZE results or
+    SUMMARY_FLUSH_INTERVAL seconds, whichever comes first.
+
+    Callbacks registered with on_flush() get (file_paths, seconds) after
+    each successful batch write.
+    """
+
+    def __init__(self, batch_size=SUMMARY_BATCH_SIZE, flush_interval=SUMMARY_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = Lock()
+        self._flush_lock = Lock()
+        self._wake = Event()
+        self._thread = None
+        self._flush_callbacks = []
+
+    def on_flush(self, callback):
+        self._flush_callbacks.append(callback)
+
+    def add(self, summary, drive_file_path):
+        with self._lock:
+            self._pending[drive_file_path] = summary
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="summary-writer", daemon=True)
+                self._thread.start()
+            if len(self._pending) >= self.batch_size:
+                self._wake.set()
+
+    def pending(self):
+        return len(self._pending)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return True
+            start = time.perf_counter()
+            if save_summaries(batch):
+                elapsed = time.perf_counter() - start
+                for callback in self._flush_callbacks:
+                    try:
+                        callback(list(batch), elapsed)
+                    except Exception as e:
+                        print(f"[error] in summary flush callback : {e}")
+                return True
+            # Put the batch back unless newer results arrived meanwhile
+            with self._lock:
+                for drive_file_path, summary in batch.items():
+                    self._pending.setdefault(drive_file_path, summary)
+            return False
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+summary_writer = SummaryWriter()
+atexit.register(summary_writer.flush)
+
+def ensure_file_path_index():
+    query = text("""CREATE INDEX IF NOT EXISTS uploaded_files_file_path_idx
+                    ON uploaded_files (file_path);
+                    """)
+    try:
+        with get_engine().connect() as conn:
+            conn.execute(query)
+            conn.commit()
+        return True
+    except Exception as e:
+        print(f"[error] while creating file_path index : {e}")
+        return False
+
+# Durable job store: one row per file_path, leased to one worker at a time
+# Set WORKER_ID to a stable, unique name per worker to resume its jobs after a restart
+WORKER_ID = os.environ.get('WORKER_ID') or f"{socket.gethostname()}:{os.getpid()}"
+STABLE_WORKER_ID = bool(os.environ.get('WORKER_ID'))
+CLAIM_LEASE_SECONDS = int(os.environ.get('CLAIM_LEASE_SECONDS', '900'))
+# Workers renew the leases of their in-flight jobs this often
+LEASE_RENEW_SECONDS = int(os.environ.get('LEASE_RENEW_SECONDS', str(CLAIM_LEASE_SECONDS // 3)))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '5'))
+# A failed job waits JOB_RETRY_BASE_SECONDS * 2^(attempts - 1), capped, before it can be claimed again
+JOB_RETRY_BASE_SECONDS = int(os.environ.get('JOB_RETRY_BASE_SECONDS', '300'))
+JOB_RETRY_MAX_SECONDS = int(os.environ.get('JOB_RETRY_MAX_SECONDS', '86400'))
+
+def ensure_job_table():
+    query = text("""CREATE TABLE IF NOT EXISTS description_jobs (
+                    file_path TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    claimed_by TEXT,
+                    claimed_at TIMESTAMPTZ,
+                    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                    );
+                    ALTER TABLE description_jobs ADD COLUMN IF NOT EXISTS timings JSONB;
+                    ALTER TABLE description_jobs ADD COLUMN IF NOT EXISTS error_class TEXT;
+                    ALTER TABLE description_jobs ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMPTZ;
+                    CREATE INDEX IF NOT EXISTS description_jobs_open_idx
+                    ON description_jobs (file_path) WHERE state IN ('queued', 'in_progress');
+                    CREATE INDEX IF NOT EXISTS uploaded_files_pending_idx
+                    ON uploaded_files (file_path) WHERE description = '';
+                    """)
+    try:
+        with get_engine().connect() as conn:
+            conn.execute(query)
+            conn.commit()
+        return True
+    except Exception as e:
+        print(f"[error] while creating job table : {e}")
+        return False
+
+def enqueue_null_notes():
+    """Add a job for every empty-description note that doesn't have an open one.
+
+    file_path is unique, so notes already queued or in progress are left
+    alone; a finished job whose description was cleared again is re-queued.
+    Failed jobs stay failed (see requeue_failed_jobs).
+    Returns the number of jobs added or re-queued.
+    """
+    query = text("""INSERT INTO description_jobs (file_path, filename)
+                    SELECT file_path, filename FROM uploaded_files
+                    WHERE description = ''
+                    ON CONFLICT (file_path) DO UPDATE
+                    SET state = 'queued', attempts = 0, last_error = NULL, error_class = NULL,
+                        next_attempt_at = NULL, updated_at = now()
+                    WHERE description_jobs.state = 'done';
+                    """)
+    try:
+        with get_engine().connect() as conn:
+            result = conn.execute(query)
+            conn.commit()
+        return result.rowcount
+    except Exception as e:
+        print("[Error] while enqueueing null notes: ",e)
+        return None
+
+def enqueue_note(drive_file_path):
+    """Add (or re-queue) the job for one note, if its description is empty"""
+    query = text("""INSERT INTO description_jobs (file_path, filename)
+                    SELECT file_path, filename FROM uploaded_files
+                    WHERE file_path = :file_path AND description = ''
+                    ON CONFLICT (file_path) DO UPDATE
+                    SET state = 'queued', attempts = 0, last_error = NULL, error_class = NULL,
+                        next_attempt_at = NULL, updated_at = now()
+                    WHERE description_jobs.state = 'done';
+                    """)
+    try:
+        with get_engine().connect() as conn:
+            result = conn.execute(query, {'file_path': drive_file_path})
+            conn.commit()
+        return result.rowcount
+    except Exception as e:
+        print("[Error] while enqueueing note: ",e)
+        return None
+
+# New uploads are announced on this channel with their file_path as payload
+UPLOAD_CHANNEL = 'notesup_uploads'
+
+def ensure_upload_trigger():
+    query = text(f"""CREATE OR REPLACE FUNCTION notesup_notify_upload() RETURNS trigger AS $$
+                    BEGIN
+                        PERFORM pg_notify('{UPLOAD_CHANNEL}', NEW.file_path);
+                        RETURN NEW;
+                    END;
+                    $$ LANGUAGE plpgsql;
+                    DROP TRIGGER IF EXISTS uploaded_files_notify ON uploaded_files;
+                    CREATE TRIGGER uploaded_files_notify
+                    AFTER INSERT ON uploaded_files
+                    FOR EACH ROW EXECUTE FUNCTION notesup_notify_upload();
+                    """)
+    try:
+        with get_engine().connect() as conn:
+            conn.execute(query)
+            conn.commit()
+        return True
+    except Exception as e:
+        print(f"[error] while creating upload trigger : {e}")
+        return False
+
+def listen_for_uploads(timeout=5.0):
+    """LISTEN on UPLOAD_CHANNEL and yield the file_paths notified, in batches.
+
+    Uses its own connection outside the pool, since it stays open for as
+    long as the caller iterates. Yields an empty list every `timeout`
+    seconds without notifications so the caller can check for shutdown.
+    Connection errors propagate; the caller reconnects.
+    """
+    import psycopg2
+    conn = psycopg2.connect(user=db_user, password=db_password, host=db_host,
+                            port=5432, dbname=db_name)
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {UPLOAD_CHANNEL};")
+        while True:
+            if select.select([conn], [], [], timeout)[0]:
+                conn.poll()
+            file_paths = [notify.payload for notify in conn.notifies]
+            conn.notifies.clear()
+            yield file_paths
+    finally:
+        conn.close()
+
+def count_open_jobs():
+    query = text("SELECT count(*) FROM description_jobs WHERE state IN ('queued', 'in_progress')")
+    try:
+        with get_engine().connect() as conn:
+            return conn.execute(query).scalar()
+    except Exception as e:
+        print("[Error] while counting open jobs: ",e)
+        return None
+
+def claim_jobs(after='', limit=100, lease_seconds=CLAIM_LEASE_SECONDS):
+    """Claim the next page of open jobs after the keyset cursor.
+
+    Queued jobs past their retry backoff, and in-progress jobs whose lease
+    expired (their worker died), are taken with FOR UPDATE SKIP LOCKED, so
+    concurrent workers never share a job. An expired job that has used up
+    JOB_MAX_ATTEMPTS goes to failed ('lease_expired') instead: a file that
+    crashes or hangs every worker must not be handed out forever.
+    Returns the claimed rows ordered by file_path.
+    """
+    expired_query = text("""UPDATE description_jobs
+                    SET state = 'failed', error_class = 'lease_expired',
+                        last_error = 'lease expired after ' || attempts || ' attempts',
+                        claimed_by = NULL, claimed_at = NULL, updated_at = now()
+                    WHERE file_path IN (
+                        SELECT file_path FROM description_jobs
+                        WHERE state = 'in_progress' AND attempts >= :max_attempts
+                          AND claimed_at < now() - make_interval(secs => :lease_seconds)
+                        FOR UPDATE SKIP LOCKED
+                    );
+                    """)
+    query = text("""WITH candidates AS (
+                        SELECT file_path FROM description_jobs
+                        WHERE state IN ('queued', 'in_progress')
+                          AND file_path > :after
+                          AND ((state = 'queued'
+                                AND (next_attempt_at IS NULL OR next_attempt_at <= now()))
+                               OR (claimed_at < now() - make_interval(secs => :lease_seconds)
+                                   AND attempts < :max_attempts))
+                        ORDER BY file_path
+                        LIMIT :limit
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    UPDATE description_jobs AS j
+                    SET state = 'in_progress', attempts = j.attempts + 1,
+                        claimed_by = :worker_id, claimed_at = now(), updated_at = now()
+                    FROM candidates AS c
+                    WHERE j.file_path = c.file_path
+                    RETURNING j.file_path, j.filename, j.attempts;
+                    """)
+    params = {
+        'after': after,
+        'limit': limit,
+        'lease_seconds': lease_seconds,
+        'max_attempts': JOB_MAX_ATTEMPTS,
+        'worker_id': WORKER_ID
+    }
+    try:
+        with get_engine().connect() as conn:
+            conn.execute(expired_query, params)
+            result = conn.execute(query, params).fetchall()
+            conn.commit()
+        return sorted(result, key=lambda row: row.file_path)
+    except Exception as e:
+        print("[Error] while claiming jobs: ",e)
+        return None
+
+def release_worker_jobs():
+    """Put this worker's in-progress jobs back in the queue.
+
+    Called on startup when WORKER_ID is stable: jobs claimed before a
+    restart can be picked up again at once instead of after their lease
+    expires. Returns the number of jobs released.
+    """
+    query = text("""UPDATE description_jobs
+                    SET state = 'queued', claimed_by = NULL, claimed_at = NULL, updated_at = now()
+                    WHERE state = 'in_progress' AND claimed_by = :worker_id;
+                    """)
     try:
-        query = text("""UPDATE uploaded_files
-                    SET description = :description
+        with get_engine().connect() as conn:
+            result = conn.execute(query, {'worker_id': WORKER_ID})
+            conn.commit()
+        return result.rowcount
+    except Exception as e:
+        print(f"[error] while releasing worker jobs : {e}")
+        return None
+
+def renew_leases(file_paths):
+    """Push back the lease expiry of jobs this worker still has in flight"""
+    if not file_paths:
+        return 0
+    query = text("""UPDATE description_jobs
+                    SET claimed_at = now()
+                    WHERE file_path = ANY(:file_paths)
+                      AND state = 'in_progress' AND claimed_by = :worker_id;
+                    """)
+    try:
+        with get_engine().connect() as conn:
+            result = conn.execute(query, {'file_paths': list(file_paths), 'worker_id': WORKER_ID})
+            conn.commit()
+        return result.rowcount
+    except Exception as e:
+        print(f"[error] while renewing job leases : {e}")
+        return None
+
+def mark_job_failed(drive_file_path, error_class, detail=None, permanent=False,
+                    max_attempts=JOB_MAX_ATTEMPTS):
+    """Record a failure and release the job, if this worker still holds it.
+
+    The job goes back to queued with an exponential backoff before it can be
+    claimed again, or to failed (terminal) once attempts run out or the
+    error is permanent.
+    """
+    query = text("""UPDATE description_jobs
+                    SET state = CASE WHEN :permanent OR attempts >= :max_attempts
+                                     THEN 'failed' ELSE 'queued' END,
+                        error_class = :error_class, last_error = :detail,
+                        next_attempt_at = now() + make_interval(secs => LEAST(
+                            :retry_max, :retry_base * power(2, GREATEST(attempts - 1, 0)))),
+                        claimed_by = NULL, claimed_at = NULL, updated_at = now()
+                    WHERE file_path = :file_path AND claimed_by = :worker_id;
+                    """)
+    params = {
+        'file_path': drive_file_path,
+        'worker_id': WORKER_ID,
+        'error_class': error_class,
+        'detail': detail or error_class,
+        'permanent': permanent,
+        'max_attempts': max_attempts,
+        'retry_base': JOB_RETRY_BASE_SECONDS,
+        'retry_max': JOB_RETRY_MAX_SECONDS
+    }
+    try:
+        with get_engine().connect() as conn:
+            conn.execute(query, params)
+            conn.commit()
+        return True
+    except Exception as e:
+        print(f"[error] while marking job failed : {e}")
+        return False
+
+def requeue_failed_jobs(error_class=None):
+    """Give failed jobs (optionally of one error class) a fresh set of attempts"""
+    query = text("""UPDATE description_jobs
+                    SET state = 'queued', attempts = 0, next_attempt_at = NULL, updated_at = now()
+                    WHERE state = 'failed'
+                      AND (CAST(:error_class AS TEXT) IS NULL OR error_class = :error_class);
+                    """)
+    try:
+        with get_engine().connect() as conn:
+            result = conn.execute(query, {'error_class': error_class})
+            conn.commit()
+        return result.rowcount
+    except Exception as e:
+        print(f"[error] while re-queueing failed jobs : {e}")
+        return None
+
+def save_job_timings(drive_file_path, timings):
+    """Store a job's stage timings (a JSON string) on its description_jobs row"""
+    query = text("""UPDATE description_jobs SET timings = CAST(:timings AS JSONB)
                     WHERE file_path = :file_path;
                     """)
-        params = {
-            'description': summary,
-            'file_path' :drive_file_path
-        }
-        with engine.connect() as conn:
-            result = conn.execute(query,params)
+    try:
+        with get_engine().connect() as conn:
+            conn.execute(query, {'file_path': drive_file_path, 'timings': timings})
             conn.commit()
-            if result:
-                return True
+        return True
     except Exception as e:
-        print(f"[error] while saving the summary : {e}")
+        print(f"[error] while saving job timings : {e}")
         return False
 
-def get_null_notes():
-    query = text("SELECT file_path,filename FROM uploaded_files WHERE description = '' ")
+def job_state_counts():
+    """Jobs per state, how many queued jobs are cooling down after a failure,
+    how many workers hold in-progress claims, and failures by error class"""
+    query = text("""SELECT state, count(*) AS jobs, count(DISTINCT claimed_by) AS workers,
+                           count(*) FILTER (WHERE next_attempt_at > now()) AS cooling_down
+                    FROM description_jobs GROUP BY state;
+                    """)
+    failed_query = text("""SELECT error_class, count(*) AS jobs FROM description_jobs
+                    WHERE state = 'failed' GROUP BY error_class;
+                    """)
     try:
-        with engine.connect() as conn:
-            result = conn.execute(query).fetchall()
-        return result if result else None
+        with get_engine().connect() as conn:
+            rows = conn.execute(query).fetchall()
+            failed = conn.execute(failed_query).fetchall()
+        counts = {row.state: row.jobs for row in rows}
+        counts['workers'] = sum(row.workers for row in rows if row.state == 'in_progress')
+        counts['cooling_down'] = sum(row.cooling_down for row in rows if row.state == 'queued')
+        counts['failed_by_class'] = {row.error_class or 'unknown': row.jobs for row in failed}
+        return counts
     except Exception as e:
-        print("[Error] while getting null notes: ",e)
+        print("[Error] while counting jobs by state: ",e)
         return None
+
+@contextmanager
+def advisory_lock(key, wait=True):
+    """Hold a Postgres session advisory lock on `key` for the block.
+
+    Coordinates worker processes on any host. With wait=False the lock is
+    only tried; yields whether it was acquired. The lock lives on a
+    connection held for the block and is released before it goes back
+    to the pool.
+    """
+    lock_query = "SELECT pg_advisory_lock(hashtext(:key))" if wait \
+        else "SELECT pg_try_advisory_lock(hashtext(:key))"
+    with get_engine().connect() as conn:
+        acquired = conn.execute(text(lock_query), {'key': key}).scalar() is not False
+        conn.commit()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                conn.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), {'key': key})
+                conn.commit()
+
+# Content-addressed cache of excerpts/descriptions, keyed by SHA-256 of the file bytes
+CONTENT_CACHE_MAX_ENTRIES = int(os.environ.get('CONTENT_CACHE_MAX_ENTRIES', '50000'))
+CONTENT_CACHE_PRUNE_EVERY = 100
+_cache_writes = 0
+
+def ensure_content_cache_table():
+    query = text("""CREATE TABLE IF NOT EXISTS content_cache (
+                    sha256 CHAR(64) PRIMARY KEY,
+                    excerpt TEXT,
+                    description TEXT,
+                    last_used_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                    );
+                    CREATE INDEX IF NOT EXISTS content_cache_last_used_idx
+                    ON content_cache (last_used_at);
+                    """)
+    try:
+        with get_engine().connect() as conn:
+            conn.execute(query)
+            conn.commit()
+        return True
+    except Exception as e:
+        print(f"[error] while creating content cache table : {e}")
+        return False
+
+def get_cached_content(sha256):
+    """Look up a cache entry and mark it as recently used"""
+    query = text("""UPDATE content_cache
+                    SET last_used_at = now()
+                    WHERE sha256 = :sha256
+                    RETURNING excerpt, description;
+                    """)
+    try:
+        with get_engine().connect() as conn:
+            row = conn.execute(query, {'sha256': sha256}).fetchone()
+            conn.commit()
+        return row
+    except Exception as e:
+        print(f"[error] while reading content cache : {e}")
+        return None
+
+def save_cached_content(sha256, excerpt=None, description=None):
+    """Insert or fill in a cache entry; None leaves a column untouched"""
+    global _cache_writes
+    query = text("""INSERT INTO content_cache (sha256, excerpt, description)
+                    VALUES (:sha256, :excerpt, :description)
+                    ON CONFLICT (sha256) DO UPDATE
+                    SET excerpt = COALESCE(EXCLUDED.excerpt, content_cache.excerpt),
+                        description = COALESCE(EXCLUDED.description, content_cache.description),
+                        last_used_at = now();
+                    """)
+    params = {
+        'sha256': sha256,
+        'excerpt': excerpt,
+        'description': description
+    }
+    try:
+        with get_engine().connect() as conn:
+            conn.execute(query, params)
+            conn.commit()
+        _cache_writes += 1
+        if _cache_writes % CONTENT_CACHE_PRUNE_EVERY == 0:
+            prune_content_cache()
+        return True
+    except Exception as e:
+        print(f"[error] while saving content cache : {e}")
+        return False
+
+def prune_content_cache(max_entries=CONTENT_CACHE_MAX_ENTRIES):
+    """Evict least recently used entries beyond max_entries"""
+    query = text("""DELETE FROM content_cache
+                    WHERE last_used_at <= (
+                        SELECT last_used_at FROM content_cache
+                        ORDER BY last_used_at DESC
+                        OFFSET :max_entries LIMIT 1
+                    );
+                    """)
+    try:
+        with get_engine().connect() as conn:
+            conn.execute(query, {'max_entries': max_entries})
+            conn.commit()
+        return True
+    except Exception as e:
+        print(f"[error] while pruning content cache : {e}")
+        return False
@@ -0,0 +1,166 @@
+"""Representative excerpt selection under a token budget.
+
+Extractors hand over text units (pages, paragraphs, lines) sampled across
+the whole document. They are regrouped into segments of about
+EXCERPT_SEGMENT_WORDS words and scored by how many of the document's
+frequent content terms they carry. Near-duplicates (running headers,
+repeated slide titles) are dropped by shingle overlap, and the best
+segments are packed into the budget and returned in document order.
+"""
+import os
+import re
+import math
+from collections import Counter
+from llm import estimate_tokens
+
+EXCERPT_TOKEN_BUDGET = int(os.getenv("EXCERPT_TOKEN_BUDGET", "600"))
+# Words scanned per document, and pages sampled from long PDFs
+EXCERPT_SCAN_WORDS = int(os.getenv("EXCERPT_SCAN_WORDS", "20000"))
+EXCERPT_MAX_PAGES = int(os.getenv("EXCERPT_MAX_PAGES", "40"))
+EXCERPT_SEGMENT_WORDS = int(os.getenv("EXCERPT_SEGMENT_WORDS", "60"))
+# DOCX/TXT paragraphs are sampled across the document in chunks of this many words
+SAMPLE_CHUNK_WORDS = int(os.getenv("SAMPLE_CHUNK_WORDS", "400"))
+# Segments sharing at least this fraction of shingles with a chosen one are skipped
+EXCERPT_DUPLICATE_SIMILARITY = float(os.getenv("EXCERPT_DUPLICATE_SIMILARITY", "0.5"))
+SHINGLE_SIZE = 4
+# The opening segment usually names the subject; nudge it up the ranking
+LEAD_BONUS = 1.5
+
+TERM_RE = re.compile(r"[^\W\d_]{3,}")
+STOPWORDS = frozenset("""
+about above after again against all also and any are because been before being below
+between both but can could did does doing down during each few for from further had has
+have having her here hers herself him himself his how into its itself just more most
+other our ours ourselves out over own same she should some such than that the their
+theirs them themselves then there these they this those through too under until very
+was were what when where which while who whom why will with would you your yours
+yourself yourselves page chapter figure table contents
+""".split())
+
+def budget_words(token_budget=EXCERPT_TOKEN_BUDGET):
+    """Rough number of words that fill `token_budget`"""
+    return token_budget * 3 // 4
+
+def sample_pages(page_count, max_pages=EXCERPT_MAX_PAGES):
+    """Evenly spaced page numbers, always including the first and last"""
+    if page_count <= max_pages:
+        return list(range(page_count))
+    if max_pages <= 1:
+        return [0]
+    step = (page_count - 1) / (max_pages - 1)
+    return sorted({round(i * step) for i in range(max_pages)})
+
+def sample_paragraphs(paragraphs, scan_words=EXCERPT_SCAN_WORDS, chunk_words=SAMPLE_CHUNK_WORDS):
+    """(section, text) units sampled evenly across paragraphs of unknown count.
+
+    Paragraphs are grouped into numbered chunks of about chunk_words and
+    every stride-th chunk is kept. Whenever the kept chunks pass
+    scan_words, every other one is dropped and the stride doubles, so
+    memory stays near scan_words while the sample spans the whole
+    document. Chunk numbers are the sections, so segments never join
+    text from distant parts. Paragraphs longer than scan_words are cut
+    to their first scan_words words.
+    """
+    kept = []
+    kept_words = 0
+    stride = 1
+    chunk, chunk_index, chunk_words_seen = [], 0, 0
+    for text in paragraphs:
+        words = text.split()[:scan_words]
+        if not words:
+            continue
+        if chunk_index % stride == 0:
+            chunk.append(' '.join(words))
+        chunk_words_seen += len(words)
+        if chunk_words_seen < chunk_words:
+            continue
+        if chunk_index % stride == 0:
+            kept.append((chunk_index, chunk))
+            kept_words += chunk_words_seen
+        chunk, chunk_index, chunk_words_seen = [], chunk_index + 1, 0
+        # Chunk 0 survives every halving; stop once it is all that is left
+        while kept_words > scan_words and len(kept) > 1:
+            stride *= 2
+            kept = [(index, texts) for index, texts in kept if index % stride == 0]
+            kept_words = sum(len(text.split()) for _, texts in kept for text in texts)
+    if chunk:
+        kept.append((chunk_index, chunk))
+    return [(index, text) for index, texts in kept for text in texts]
+
+def terms(words):
+    return [term for term in TERM_RE.findall(' '.join(words).lower()) if term not in STOPWORDS]
+
+def build_segments(units, segment_words=EXCERPT_SEGMENT_WORDS):
+    """Regroup (section, text) units into word lists of about segment_words.
+
+    Short consecutive units of one section are merged (a heading joins the
+    paragraph under it); long units are cut into windows.
+    """
+    segments = []
+    current = []
+    current_section = None
+    for section, text in units:
+        words = text.split()
+        if not words:
+            continue
+        if current and section != current_section:
+            segments.append(current)
+            current = []
+        current_section = section
+        current += words
+        while len(current) >= segment_words:
+            segments.append(current[:segment_words])
+            current = current[segment_words:]
+    if current:
+        segments.append(current)
+    return segments
+
+def shingles(words):
+    lowered = [word.lower() for word in words]
+    if len(lowered) <= SHINGLE_SIZE:
+        return {tuple(lowered)}
+    return {tuple(lowered[i:i + SHINGLE_SIZE]) for i in range(len(lowered) - SHINGLE_SIZE + 1)}
+
+def similarity(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+def select_excerpt(units, token_budget=EXCERPT_TOKEN_BUDGET):
+    """Pack the most representative, non-duplicate segments into token_budget"""
+    segments = build_segments(units)
+    if not segments:
+        return ""
+
+    segment_terms = [terms(words) for words in segments]
+    frequency = Counter(term for found in segment_terms for term in found)
+    scored = []
+    for index, (words, found) in enumerate(zip(segments, segment_terms)):
+        # Terms the whole document keeps returning to describe its topic;
+        # dividing by sqrt(length) favours dense segments over long ones
+        score = sum(math.log1p(frequency[term]) for term in set(found)) / math.sqrt(len(words))
+        if index == 0:
+            score *= LEAD_BONUS
+        scored.append((score, index))
+
+    chosen = []
+    chosen_shingles = []
+    used = 0
+    for score, index in sorted(scored, key=lambda s: (-s[0], s[1])):
+        if score <= 0 and chosen:
+            break
+        text = ' '.join(segments[index])
+        tokens = estimate_tokens(text)
+        if used + tokens > token_budget:
+            continue
+        segment_shingles = shingles(segments[index])
+        if any(similarity(segment_shingles, other) >= EXCERPT_DUPLICATE_SIMILARITY
+               for other in chosen_shingles):
+            continue
+        chosen.append(index)
+        chosen_shingles.append(segment_shingles)
+        used += tokens
+
+    if not chosen:
+        # Even the best segment overflows the budget: keep its leading words
+        words = segments[max(scored)[1]]
+        return ' '.join(words[:budget_words(token_budget)])
+    return '\n'.join(' '.join(segments[index]) for index in sorted(chosen))
@@ -0,0 +1,93 @@
+"""Memory budget governor: collects garbage only under pressure and admits
+jobs only while their estimated footprint fits in the budget."""
+import os
+import gc
+import time
+from threading import Condition
+import psutil
+
+MEMORY_BUDGET_MB = int(os.getenv("MEMORY_BUDGET_MB", "1024"))
+# Fraction of the budget above which a full collection is worth its cost
+GC_PRESSURE_RATIO = float(os.getenv("GC_PRESSURE_RATIO", "0.8"))
+GC_MIN_INTERVAL = float(os.getenv("GC_MIN_INTERVAL", "5"))
+
+MB = 1024 * 1024
+# Rough in-memory cost of one page rendered for OCR (A4, 150 DPI, plus Tesseract)
+OCR_PAGE_BYTES = 12 * MB
+# Parsed-document overhead relative to the file size, by extension
+EXPANSION = {
+    ".pdf": 2,
+    ".docx": 6,
+    ".pptx": 6,
+    ".txt": 1,
+}
+
+class MemoryGovernor:
+    def __init__(self, budget_mb=MEMORY_BUDGET_MB, pressure_ratio=GC_PRESSURE_RATIO,
+                 min_interval=GC_MIN_INTERVAL):
+        self.budget = budget_mb * MB
+        self.pressure_ratio = pressure_ratio
+        self.min_interval = min_interval
+        self.reserved = 0
+        self.active_jobs = 0
+        self.collections = 0
+        self._last_collect = 0.0
+        self._process = psutil.Process(os.getpid())
+        self._cond = Condition()
+
+    def rss(self):
+        return self._process.memory_info().rss
+
+    def maybe_collect(self):
+        """Run a full collection only when RSS is near the budget, at most
+        once per min_interval seconds. Returns True if it collected."""
+        now = time.monotonic()
+        if now - self._last_collect < self.min_interval:
+            return False
+        if self.rss() < self.budget * self.pressure_ratio:
+            return False
+        self._last_collect = now
+        gc.collect()
+        self.collections += 1
+        return True
+
+    def estimate(self, size_bytes, ext, page_count=0, ocr_pages=0):
+        return size_bytes * EXPANSION.get(ext, 2) + ocr_pages * OCR_PAGE_BYTES + page_count * 64 * 1024
+
+    def admit(self, estimated_bytes):
+        """Context manager that defers a job until its estimate fits the budget.
+
+        A job is always admitted when nothing else is running, so one job
+        larger than the budget still makes progress.
+        """
+        return _Admission(self, estimated_bytes)
+
+    def _acquire(self, estimated_bytes):
+        with self._cond:
+            while self.active_jobs and self.rss() + self.reserved + estimated_bytes > self.budget:
+                self.maybe_collect()
+                self._cond.wait(timeout=1.0)
+            self.reserved += estimated_bytes
+            self.active_jobs += 1
+
+    def _release(self, estimated_bytes):
+        with self._cond:
+            self.reserved -= estimated_bytes
+            self.active_jobs -= 1
+            self._cond.notify_all()
+        self.maybe_collect()
+
+class _Admission:
+    def __init__(self, governor, estimated_bytes):
+        self.governor = governor
+        self.estimated_bytes = estimated_bytes
+
+    def __enter__(self):
+        self.governor._acquire(self.estimated_bytes)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.governor._release(self.estimated_bytes)
+        return False
+
+governor = MemoryGovernor()
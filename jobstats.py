@@ -0,0 +1,122 @@
+"""Per-job stage timings, kept for the most recent jobs in a bounded ring buffer."""
+import os
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+JOB_TIMINGS_SIZE = int(os.getenv("JOB_TIMINGS_SIZE", "500"))
+# Outcomes whose description goes through the batched writer
+WRITE_OUTCOMES = ("described", "cache_hit")
+
+_local = threading.local()
+
+class JobTimings:
+    """Seconds spent per stage for one note, plus OCR page count and outcome"""
+
+    def __init__(self, file_path, file_name):
+        self.file_path = file_path
+        self.file_name = file_name
+        self.started_at = time.time()
+        self.finished_at = None
+        self.outcome = None
+        self.stages = {}
+        self.ocr_pages = 0
+        self.written = False
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def measure(self, stage):
+        """Time the block as `stage`; OCR run inside it is attributed to this job"""
+        previous = getattr(_local, "timings", None)
+        _local.timings = self
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add(stage, time.perf_counter() - start)
+            _local.timings = previous
+
+    @property
+    def complete(self):
+        # A job that saves a description is complete once its batched write has landed
+        return self.finished_at is not None and (self.outcome not in WRITE_OUTCOMES or self.written)
+
+    def as_dict(self):
+        return {
+            "file_path": self.file_path,
+            "file_name": self.file_name,
+            "outcome": self.outcome,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "total_s": round(self.finished_at - self.started_at, 3) if self.finished_at else None,
+            "stages_s": {stage: round(seconds, 3) for stage, seconds in self.stages.items()},
+            "ocr_pages": self.ocr_pages,
+        }
+
+def record_ocr(pages, seconds):
+    """Called by the OCR module; credits the job measured on this thread, if any"""
+    timings = getattr(_local, "timings", None)
+    if timings is not None:
+        timings.ocr_pages += pages
+        timings.add("ocr", seconds)
+
+class JobLog:
+    """Ring buffer of the last `size` finished jobs, indexed by file_path.
+
+    Listeners are called with each JobTimings once it is complete.
+    """
+
+    def __init__(self, size=JOB_TIMINGS_SIZE):
+        self.size = size
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _completed(self, timings):
+        for callback in list(self._listeners):
+            try:
+                callback(timings)
+            except Exception as e:
+                print(f"Job timing listener failed: {e}")
+
+    def finish(self, timings, outcome):
+        timings.outcome = outcome
+        timings.finished_at = time.time()
+        with self._lock:
+            self._records.pop(timings.file_path, None)
+            self._records[timings.file_path] = timings
+            while len(self._records) > self.size:
+                self._records.popitem(last=False)
+        if timings.complete:
+            self._completed(timings)
+
+    def record_write(self, file_paths, seconds):
+        """Credit a batched description write to every job in the batch"""
+        written = []
+        with self._lock:
+            for file_path in file_paths:
+                timings = self._records.get(file_path)
+                if timings is not None and not timings.written:
+                    timings.add("db_write", seconds)
+                    timings.written = True
+                    if timings.complete:
+                        written.append(timings)
+        for timings in written:
+            self._completed(timings)
+
+    def recent(self, limit=50):
+        with self._lock:
+            records = list(self._records.values())[-limit:]
+        return [timings.as_dict() for timings in reversed(records)]
+
+job_log = JobLog()
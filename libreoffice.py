@@ -0,0 +1,157 @@
+"""Pool of warm headless LibreOffice instances for legacy office formats.
+
+Each instance is an `unoserver` process wrapping one soffice with its own
+user profile and ports. Ports are picked free at each start and profiles
+live under a per-process directory, so several workers (or gunicorn
+processes with an embedded worker) can share a host. Instances start on
+first use, stay up between conversions, and are recycled after
+OFFICE_MAX_JOBS conversions or when a conversion exceeds OFFICE_TIMEOUT.
+"""
+import os
+import shlex
+import shutil
+import socket
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from queue import Queue
+from threading import Lock
+
+# unoserver has to run under a Python that can import LibreOffice's `uno`
+UNOSERVER_CMD = os.getenv("UNOSERVER_CMD", "/usr/bin/python3 -m unoserver.server")
+OFFICE_POOL_SIZE = int(os.getenv("OFFICE_POOL_SIZE", "2"))
+OFFICE_MAX_JOBS = int(os.getenv("OFFICE_MAX_JOBS", "200"))
+OFFICE_TIMEOUT = float(os.getenv("OFFICE_TIMEOUT", "60"))
+OFFICE_START_TIMEOUT = float(os.getenv("OFFICE_START_TIMEOUT", "60"))
+OFFICE_PROFILE_DIR = os.getenv("OFFICE_PROFILE_DIR", "/tmp/notesup_office")
+
+# Legacy extension -> format the normal extractors can read. Text documents
+# export straight to text; presentations go through a text-layer PDF.
+LEGACY_FORMATS = {
+    ".doc": "txt",
+    ".odt": "txt",
+    ".rtf": "txt",
+    ".ppt": "pdf",
+    ".pps": "pdf",
+    ".odp": "pdf",
+}
+
+class ConversionError(Exception):
+    pass
+
+class ConversionTimeout(ConversionError):
+    pass
+
+def free_port():
+    """A port nothing on this host is listening on right now"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def process_profile_dir():
+    return os.path.join(OFFICE_PROFILE_DIR, f"pid_{os.getpid()}")
+
+class OfficeInstance:
+    def __init__(self, index):
+        self.index = index
+        self.port = None
+        self.uno_port = None
+        self.profile = os.path.join(process_profile_dir(), f"profile_{index}")
+        self.process = None
+        self.jobs = 0
+
+    def start(self):
+        os.makedirs(self.profile, exist_ok=True)
+        self.port = free_port()
+        self.uno_port = free_port()
+        while self.uno_port == self.port:
+            self.uno_port = free_port()
+        cmd = shlex.split(UNOSERVER_CMD) + [
+            "--interface", "127.0.0.1",
+            "--port", str(self.port),
+            "--uno-port", str(self.uno_port),
+            "--user-installation", f"file://{self.profile}",
+        ]
+        self.process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.jobs = 0
+        deadline = time.monotonic() + OFFICE_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise ConversionError(f"LibreOffice instance {self.index} exited during startup")
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=1):
+                    print(f"[✓] LibreOffice instance {self.index} ready on port {self.port}")
+                    return
+            except OSError:
+                time.sleep(0.5)
+        self.stop()
+        raise ConversionError(f"LibreOffice instance {self.index} did not start in time")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def convert(self, data, convert_to):
+        from unoserver.client import UnoClient
+        client = UnoClient(server="127.0.0.1", port=str(self.port))
+        self.jobs += 1
+        return client.convert(indata=data, convert_to=convert_to)
+
+class OfficePool:
+    def __init__(self, size=OFFICE_POOL_SIZE):
+        self.size = size
+        self._idle = Queue()
+        self._lock = Lock()
+        self._started = False
+        # Conversions run on these threads so a hung instance can be timed out
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="office")
+
+    def _ensure_started(self):
+        with self._lock:
+            if not self._started:
+                for index in range(self.size):
+                    self._idle.put(OfficeInstance(index))
+                self._started = True
+
+    def convert(self, data, ext):
+        """Convert legacy office bytes; returns (converted bytes, new extension)"""
+        convert_to = LEGACY_FORMATS[ext]
+        self._ensure_started()
+        instance = self._idle.get()
+        try:
+            if not instance.alive:
+                instance.start()
+            future = self._executor.submit(instance.convert, data, convert_to)
+            try:
+                result = future.result(timeout=OFFICE_TIMEOUT)
+            except FutureTimeout:
+                # Killing the instance unblocks the stuck conversion thread
+                instance.stop()
+                raise ConversionTimeout(f"Conversion of {ext} timed out after {OFFICE_TIMEOUT}s")
+            except Exception as e:
+                instance.stop()
+                raise ConversionError(f"Conversion of {ext} failed: {e}") from e
+            if instance.jobs >= OFFICE_MAX_JOBS:
+                instance.stop()
+            return result, "." + convert_to
+        finally:
+            self._idle.put(instance)
+
+    def shutdown(self):
+        with self._lock:
+            while not self._idle.empty():
+                self._idle.get().stop()
+            if self._started:
+                shutil.rmtree(process_profile_dir(), ignore_errors=True)
+            self._started = False
+
+office_pool = OfficePool()
@@ -0,0 +1,172 @@
+import os
+import re
+import json
+import time
+import random
+from threading import Lock
+from ratelimit import TokenBucket, AdaptiveConcurrency
+import metrics
+
+LLM_MODEL = os.getenv("LLM_MODEL", "gemma-3-27b-it")
+# Notes packed into one request in batching mode; 1 disables batching
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "1"))
+
+# Quota budgets and flow control for the Gemini API
+LLM_RPM = int(os.getenv("LLM_RPM", "30"))
+LLM_TPM = int(os.getenv("LLM_TPM", "15000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", os.getenv("SUMMARIZE_WORKERS", "2")))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "2"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "60"))
+# Rough allowance for the generated description, counted against LLM_TPM
+OUTPUT_TOKENS_PER_NOTE = 120
+
+INSUFFICIENT_CONTENT = "No sufficient content available to generate a description."
+
+PROMPT = (
+    "I will provide you with a small portion of text from some study material. "
+    "Your task is to analyze the content and generate a short, clear description of what the full material is likely about. "
+    "The description should be 2–3 sentences long, summarizing the overall topic and purpose, and suitable as a preview or caption for a notes-sharing platform. "
+    "Use simple, professional language that helps students quickly understand what the content covers. "
+    "Do not copy exact sentences—paraphrase instead. Avoid unnecessary details and stay focused on the main subject. "
+
+    "If the input is empty or too short to understand the context, return this message: 'Not enough data to generate a description.' "
+
+    "If the content seems to be from a question bank, return a description like: 'This is a set of question bank for [subject_name], containing important questions for practice and review.' "
+
+    "If the input appears unrelated to academic content, or contains irrelevant or non-syllabus-based material, return the same message: 'Not enough data to generate a description or failed to extract text from the notes' "
+
+    "Your only job is to generate a meaningful description or handle the input based on these instructions—do not do anything else."
+)
+
+BATCH_PROMPT = (
+    PROMPT + " "
+    "You will receive several separate notes, each starting with a line of the form '### NOTE <id>'. "
+    "Apply the instructions above to each note independently. "
+    "Respond with only a JSON object that maps every note id (as a string) to its description, "
+    "with no extra text or code fences."
+)
+
+_client = None
+_client_lock = Lock()
+
+request_bucket = TokenBucket(LLM_RPM)
+token_bucket = TokenBucket(LLM_TPM)
+concurrency = AdaptiveConcurrency(initial=1, maximum=LLM_MAX_CONCURRENCY)
+
+class LLMError(Exception):
+    """Generation failed after retries; the note should be retried later"""
+
+def get_client():
+    """One long-lived Gemini client per process, created on first call"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            # google-genai takes about a second to import; only pay it when needed
+            from google import genai
+            _client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+        return _client
+
+def has_sufficient_content(text):
+    return bool(text) and len(text.split()) >= 15
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+def is_retryable(error):
+    code = getattr(error, "code", None)
+    return code == 429 or (isinstance(code, int) and code >= 500)
+
+def call_model(contents, notes=1):
+    """Call the model within the RPM/TPM budgets, backing off on 429/5xx.
+
+    Raises LLMError once retries are exhausted or the error is permanent.
+    """
+    tokens = estimate_tokens(contents) + OUTPUT_TOKENS_PER_NOTE * notes
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        request_bucket.acquire(1)
+        token_bucket.acquire(tokens)
+        with concurrency:
+            start = time.perf_counter()
+            try:
+                response = get_client().models.generate_content(model=LLM_MODEL, contents=contents)
+            except Exception as e:
+                metrics.llm_duration.observe(time.perf_counter() - start)
+                if getattr(e, "code", None) == 429:
+                    concurrency.on_throttle()
+                if not is_retryable(e) or attempt == LLM_MAX_RETRIES:
+                    metrics.llm_errors.inc(retried="false")
+                    raise LLMError(str(e)) from e
+                metrics.llm_errors.inc(retried="true")
+                print(f"LLM call failed (attempt {attempt + 1}), backing off: {e}")
+            else:
+                metrics.llm_duration.observe(time.perf_counter() - start)
+                concurrency.on_success()
+                if not response.text:
+                    raise LLMError("Empty response from model")
+                return response.text
+        # Full jitter keeps throttled callers from retrying in lockstep
+        time.sleep(random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt)))
+
+def generate_description_from_text(text):
+    """Raises LLMError when no description could be generated"""
+    if not has_sufficient_content(text):
+        return INSUFFICIENT_CONTENT
+    return call_model(PROMPT + "\n\n" + text)
+
+def parse_batch_response(response_text):
+    """Parse the {id: description} object, tolerating code fences and chatter"""
+    if not response_text:
+        return {}
+    match = re.search(r"\{.*\}", response_text, re.DOTALL)
+    if not match:
+        return {}
+    try:
+        parsed = json.loads(match.group(0))
+    except ValueError:
+        return {}
+    if not isinstance(parsed, dict):
+        return {}
+    return {str(key): value for key, value in parsed.items()
+            if isinstance(value, str) and value.strip()}
+
+def generate_descriptions_batch(texts):
+    """Generate descriptions for several notes in one request.
+
+    `texts` maps note id -> excerpt. Notes the batch response doesn't cover
+    (or the whole batch, if parsing fails) fall back to one request each;
+    notes that still fail map to None. If the call itself fails (quota
+    exhausted after retries), every note maps to None for a later retry
+    rather than multiplying the failed request into one per note.
+    """
+    results = {}
+    batch = {}
+    for note_id, text in texts.items():
+        if has_sufficient_content(text):
+            batch[str(note_id)] = text
+        else:
+            results[note_id] = INSUFFICIENT_CONTENT
+
+    batch_results = {}
+    if len(batch) > 1:
+        contents = BATCH_PROMPT + "\n\n" + "\n\n".join(
+            f"### NOTE {note_id}\n{text}" for note_id, text in batch.items()
+        )
+        try:
+            batch_results = parse_batch_response(call_model(contents, notes=len(batch)))
+        except LLMError as e:
+            print(f"Error while generating batched summaries: {e}")
+            results.update((note_id, None) for note_id in texts if note_id not in results)
+            return results
+
+    for note_id, text in texts.items():
+        if note_id in results:
+            continue
+        description = batch_results.get(str(note_id))
+        if description is None:
+            try:
+                description = generate_description_from_text(text)
+            except LLMError as e:
+                print(f"Error while generating summary: {e}")
+        results[note_id] = description
+    return results
@@ -0,0 +1,197 @@
+"""Minimal in-process metrics registry rendered in the Prometheus text format."""
+import os
+import json
+import math
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from threading import Lock, Thread
+import psutil
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_registry = []
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + (list(extra.items()) if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join(f'{name}="{str(value)}"' for name, value in pairs)
+    return "{" + body + "}"
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._lock = Lock()
+        _registry.append(self)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        super().__init__(name, help_text)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(Metric):
+    """Gauge set directly, or computed at scrape time from `func`.
+
+    `func` returns either a number or a {label_value: number} dict, in which
+    case `label` names the label.
+    """
+    kind = "gauge"
+
+    def __init__(self, name, help_text, func=None, label=None):
+        super().__init__(name, help_text)
+        self._values = {}
+        self.func = func
+        self.label = label
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self):
+        if self.func is not None:
+            try:
+                value = self.func()
+            except Exception:
+                return []
+            if isinstance(value, dict):
+                items = [(((self.label, k),), v) for k, v in value.items()]
+            else:
+                items = [((), value)]
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in items]
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets) + (math.inf,)
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            items = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': _format_value(bound)})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+def render_metrics():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+def serve_metrics(port, host="0.0.0.0", routes=None):
+    """Serve /metrics from a background thread, for processes without Flask.
+
+    `routes` maps extra paths to handler(method, params, headers) returning
+    (status, JSON-serialisable body); params are the query string values.
+    """
+    routes = dict(routes or {})
+
+    class Handler(BaseHTTPRequestHandler):
+        def _respond(self, status, body, content_type):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _handle(self, method):
+            url = urlparse(self.path)
+            if url.path == "/metrics" and method == "GET":
+                self._respond(200, render_metrics().encode(), "text/plain; version=0.0.4")
+                return
+            handler = routes.get(url.path)
+            if handler is None:
+                self.send_error(404)
+                return
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            status, body = handler(method, params, self.headers)
+            self._respond(status, json.dumps(body).encode(), "application/json")
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    print(f"[✓] Metrics served on port {port}")
+    return server
+
+# Metrics shared across modules
+download_bytes = Counter("notesup_download_bytes_total", "Bytes downloaded from Drive")
+download_duration = Histogram("notesup_download_duration_seconds", "Drive download time per file")
+extract_duration = Histogram("notesup_extract_duration_seconds", "Text extraction time per file, by file type")
+ocr_pages = Counter("notesup_ocr_pages_total", "Pages sent through OCR")
+ocr_escalations = Counter("notesup_ocr_escalations_total", "OCR pages re-run at high DPI after a low-confidence pass")
+ocr_page_duration = Histogram("notesup_ocr_page_duration_seconds", "OCR time per page")
+llm_duration = Histogram("notesup_llm_request_duration_seconds", "Gemini request latency")
+llm_errors = Counter("notesup_llm_errors_total", "Gemini request errors, by whether they were retried")
+db_flush_duration = Histogram("notesup_db_flush_duration_seconds", "Batched description write latency")
+db_flush_rows = Counter("notesup_db_flush_rows_total", "Descriptions written by batched flushes")
+jobs_completed = Counter("notesup_jobs_completed_total", "Notes that left the pipeline, by outcome")
+
+_process = psutil.Process(os.getpid())
+process_rss = Gauge("process_resident_memory_bytes", "Resident memory size in bytes",
+                    func=lambda: _process.memory_info().rss)
@@ -0,0 +1,332 @@
+import os
+import io
+import platform
+import shutil
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from threading import Lock
+import fitz  # PyMuPDF
+from PIL import Image
+import pytesseract
+import metrics
+import jobstats
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# "auto" prefers the in-process tesserocr backend when it is installed
+OCR_BACKEND = os.getenv("OCR_BACKEND", "auto")
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 2)))
+# Pages submitted per document ahead of the word_limit check
+OCR_PREFETCH = int(os.getenv("OCR_PREFETCH", str(OCR_WORKERS)))
+
+# "adaptive" OCRs a low-DPI render first and escalates on low confidence;
+# "fixed" renders once at the caller's DPI
+OCR_MODE = os.getenv("OCR_MODE", "adaptive")
+OCR_LOW_DPI = int(os.getenv("OCR_LOW_DPI", "100"))
+OCR_HIGH_DPI = int(os.getenv("OCR_HIGH_DPI", "200"))
+OCR_MIN_CONFIDENCE = float(os.getenv("OCR_MIN_CONFIDENCE", "70"))
+# Crop to the inked region found on a coarse OCR_DETECT_DPI render
+OCR_CROP = os.getenv("OCR_CROP", "1") == "1"
+OCR_DETECT_DPI = 36
+
+class OCRError(Exception):
+    """Every page sent to OCR failed (e.g. Tesseract missing or broken)"""
+
+_executor = None
+_executor_lock = Lock()
+_backend = None
+
+# Configure Tesseract path based on environment
+def configure_tesseract():
+    """Configure Tesseract OCR path based on the operating system"""
+    if platform.system() == "Windows":
+        # Windows path (for local development)
+        tesseract_path = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+        if os.path.exists(tesseract_path):
+            pytesseract.pytesseract.tesseract_cmd = tesseract_path
+        else:
+            print("Warning: Tesseract not found at expected Windows path")
+    elif platform.system() == "Linux":
+        # Linux path (for Docker container)
+        tesseract_path = shutil.which('tesseract')
+        if tesseract_path:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_path
+        else:
+            print("Warning: Tesseract not found in PATH")
+    else:
+        # macOS or other systems
+        tesseract_path = shutil.which('tesseract')
+        if tesseract_path:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_path
+
+# Every process that loads OCR needs the tesseract binary path
+configure_tesseract()
+
+def perform_ocr_on_page(page, page_num, dpi=150):
+    """Perform OCR on a single page with proper resource management"""
+    pix = None
+    image = None
+    text = ""
+
+    try:
+        # Create pixmap with specified DPI
+        pix = page.get_pixmap(dpi=dpi)
+
+        # Convert to PIL Image
+        image_bytes = pix.tobytes("png")
+        image = Image.open(io.BytesIO(image_bytes))
+
+        # Perform OCR with optimized config
+        ocr_config = '--oem 3 --psm 6'
+        text = pytesseract.image_to_string(image, config=ocr_config)
+
+    except Exception as ocr_error:
+        print(f"OCR failed on page {page_num}: {ocr_error}")
+        raise
+
+    finally:
+        # Explicit cleanup
+        if image:
+            image.close()
+            del image
+        if pix:
+            del pix
+
+    return text
+
+def render_gray(page, dpi, clip=None):
+    return page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False, clip=clip)
+
+def gray_image(pix):
+    return Image.frombytes("L", (pix.width, pix.height), pix.samples, "raw", "L", pix.stride)
+
+def detect_text_region(page):
+    """Bounding box of the ink on a coarse render, in page coordinates.
+
+    Returns None when cropping would not help (ink spans nearly the whole
+    page) and an empty Rect when the page is blank.
+    """
+    pix = render_gray(page, OCR_DETECT_DPI)
+    image = gray_image(pix)
+    try:
+        bbox = image.point(lambda p: 255 if p < 160 else 0).getbbox()
+    finally:
+        image.close()
+    if bbox is None:
+        return fitz.Rect()
+    scale = 72.0 / OCR_DETECT_DPI
+    margin = 0.02 * max(page.rect.width, page.rect.height)
+    x0, y0, x1, y1 = bbox
+    region = fitz.Rect(x0 * scale - margin, y0 * scale - margin,
+                       x1 * scale + margin, y1 * scale + margin)
+    region = (region + (page.rect.x0, page.rect.y0, page.rect.x0, page.rect.y0)) & page.rect
+    if abs(region) > 0.9 * abs(page.rect):
+        return None
+    return region
+
+class PytesseractBackend:
+    """Fallback backend: a tesseract subprocess per page"""
+    name = "pytesseract"
+
+    def ocr_page(self, page, page_num, dpi=150):
+        return perform_ocr_on_page(page, page_num, dpi=dpi)
+
+    def recognize(self, pix, dpi):
+        """Returns (text, mean word confidence 0-100) for a grayscale pixmap"""
+        image = gray_image(pix)
+        try:
+            data = pytesseract.image_to_data(
+                image, config=f'--oem 3 --psm 6 --dpi {dpi}',
+                output_type=pytesseract.Output.DICT)
+        finally:
+            image.close()
+        words = []
+        confidences = []
+        for word, conf in zip(data['text'], data['conf']):
+            conf = float(conf)
+            if word.strip() and conf >= 0:
+                words.append(word)
+                confidences.append(conf)
+        mean_conf = sum(confidences) / len(confidences) if confidences else 0.0
+        return ' '.join(words), mean_conf
+
+class TesserocrBackend:
+    """In-process backend holding one Tesseract API handle per worker process.
+
+    The page is rendered straight to an 8-bit grayscale pixmap and its raw
+    samples are handed to Tesseract, skipping PNG encode/decode and the
+    per-page subprocess.
+    """
+    name = "tesserocr"
+
+    def __init__(self):
+        self.api = tesserocr.PyTessBaseAPI(
+            lang="eng",
+            psm=tesserocr.PSM.SINGLE_BLOCK,
+            oem=tesserocr.OEM.DEFAULT,
+        )
+
+    def ocr_page(self, page, page_num, dpi=150):
+        try:
+            return self.recognize(render_gray(page, dpi), dpi)[0]
+        except Exception as ocr_error:
+            print(f"OCR failed on page {page_num}: {ocr_error}")
+            raise
+
+    def recognize(self, pix, dpi):
+        """Returns (text, mean word confidence 0-100) for a grayscale pixmap"""
+        try:
+            self.api.SetImageBytes(pix.samples, pix.width, pix.height, pix.n, pix.stride)
+            self.api.SetSourceResolution(dpi)
+            text = self.api.GetUTF8Text()
+            return text, float(self.api.MeanTextConf())
+        finally:
+            self.api.Clear()
+
+    def close(self):
+        self.api.End()
+
+def ocr_page_adaptive(backend, page, page_num):
+    """Cheap low-DPI pass first; re-render at OCR_HIGH_DPI only when Tesseract's
+    mean word confidence is below OCR_MIN_CONFIDENCE.
+
+    Returns (text, escalated).
+    """
+    try:
+        clip = detect_text_region(page) if OCR_CROP else None
+        if clip is not None and clip.is_empty:
+            return "", False
+
+        text, confidence = backend.recognize(render_gray(page, OCR_LOW_DPI, clip), OCR_LOW_DPI)
+        if confidence >= OCR_MIN_CONFIDENCE or OCR_HIGH_DPI <= OCR_LOW_DPI:
+            return text, False
+
+        high_text, high_confidence = backend.recognize(render_gray(page, OCR_HIGH_DPI, clip), OCR_HIGH_DPI)
+        return (high_text if high_confidence >= confidence else text), True
+
+    except Exception as ocr_error:
+        print(f"OCR failed on page {page_num}: {ocr_error}")
+        raise
+
+def get_ocr_backend():
+    """Per-process OCR backend, created on first use"""
+    global _backend
+    if _backend is None:
+        if OCR_BACKEND in ("auto", "tesserocr") and tesserocr is not None:
+            try:
+                _backend = TesserocrBackend()
+            except Exception as e:
+                print(f"Warning: tesserocr backend unavailable, using pytesseract: {e}")
+        elif OCR_BACKEND == "tesserocr":
+            print("Warning: tesserocr is not installed, using pytesseract")
+        if _backend is None:
+            _backend = PytesseractBackend()
+    return _backend
+
+def _init_ocr_worker():
+    configure_tesseract()
+    get_ocr_backend()
+
+def _single_page_pdf(doc, page_num):
+    """Copy one page into a standalone PDF so only that page crosses to the pool"""
+    single = fitz.open()
+    try:
+        single.insert_pdf(doc, from_page=page_num, to_page=page_num)
+        return single.tobytes()
+    finally:
+        single.close()
+
+def _ocr_page_task(page_pdf, page_num, dpi):
+    """Runs inside a pool process: open a one-page PDF and OCR it.
+
+    Returns (text, seconds spent, escalated) so the parent can record metrics.
+    """
+    doc = None
+    start = time.perf_counter()
+    try:
+        doc = fitz.open(stream=page_pdf, filetype="pdf")
+        backend = get_ocr_backend()
+        if OCR_MODE == "adaptive":
+            text, escalated = ocr_page_adaptive(backend, doc[0], page_num)
+        else:
+            text, escalated = backend.ocr_page(doc[0], page_num, dpi=dpi), False
+        return text, time.perf_counter() - start, escalated
+    finally:
+        if doc:
+            doc.close()
+
+def get_ocr_executor():
+    """Shared process pool, so pages from different documents interleave"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn avoids forking the threaded pipeline process
+            _executor = ProcessPoolExecutor(
+                max_workers=OCR_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_ocr_worker,
+            )
+        return _executor
+
+def shutdown_ocr_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+def ocr_pages(doc, page_nums, word_limit, dpi=150):
+    """OCR `page_nums` of an open document in parallel until `word_limit` words.
+
+    Returns {page_num: text} for the pages that finished. Pages are submitted
+    in order with a bounded lookahead; once the completed pages hold enough
+    words, outstanding pages are cancelled. Raises OCRError when every
+    finished page failed, so the caller doesn't take that for a blank scan.
+    """
+    executor = get_ocr_executor()
+    start = time.perf_counter()
+    pending_pages = list(page_nums)
+    futures = {}
+    results = {}
+    failed = 0
+    word_count = 0
+
+    def submit_next():
+        while pending_pages and len(futures) < OCR_PREFETCH:
+            page_num = pending_pages.pop(0)
+            page_pdf = _single_page_pdf(doc, page_num)
+            futures[executor.submit(_ocr_page_task, page_pdf, page_num, dpi)] = page_num
+
+    try:
+        submit_next()
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                page_num = futures.pop(future)
+                try:
+                    text, elapsed, escalated = future.result()
+                    metrics.ocr_page_duration.observe(elapsed)
+                    if escalated:
+                        metrics.ocr_escalations.inc()
+                except Exception as e:
+                    print(f"OCR failed on page {page_num}: {e}")
+                    failed += 1
+                    text = ""
+                metrics.ocr_pages.inc()
+                results[page_num] = text
+                word_count += len(text.split())
+            if word_count >= word_limit:
+                break
+            submit_next()
+    finally:
+        for future in futures:
+            future.cancel()
+        jobstats.record_ocr(len(results), time.perf_counter() - start)
+
+    if results and failed == len(results):
+        raise OCRError(f"OCR failed on all {failed} pages")
+    return results
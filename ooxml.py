@@ -0,0 +1,88 @@
+"""Streaming text readers for DOCX and PPTX that parse straight from the zip.
+
+Only word/document.xml or the slide parts are read, element by element,
+so callers can stop as soon as they have enough words without loading the
+whole package (media, styles, other slides) the way python-docx and
+python-pptx do.
+"""
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+A_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
+P_NS = "http://schemas.openxmlformats.org/presentationml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+# Errors meaning the package isn't the well-formed OOXML these readers expect
+MALFORMED_ERRORS = (zipfile.BadZipFile, KeyError, ET.ParseError, ValueError)
+
+# Elements standing for whitespace inside a paragraph. w:tab also marks tab
+# stops in paragraph properties, which only adds harmless extra whitespace.
+DOCX_BREAKS = {f"{{{W_NS}}}tab": "\t", f"{{{W_NS}}}br": "\n", f"{{{W_NS}}}cr": "\n"}
+PPTX_BREAKS = {f"{{{A_NS}}}br": "\n"}
+
+def _iter_paragraphs(stream, paragraph_tag, text_tag, breaks):
+    """Yield the text of each paragraph element as it finishes parsing.
+
+    Paragraphs can nest (a text box inside a paragraph), so each open one
+    collects into its own buffer: the inner text is yielded once, and the
+    outer paragraph keeps the text around it.
+    """
+    buffers = []
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            if elem.tag == paragraph_tag:
+                buffers.append([])
+            continue
+        if not buffers:
+            continue
+        if elem.tag == text_tag:
+            if elem.text:
+                buffers[-1].append(elem.text)
+        elif elem.tag in breaks:
+            buffers[-1].append(breaks[elem.tag])
+        elif elem.tag == paragraph_tag:
+            text = "".join(buffers.pop())
+            elem.clear()
+            if text.strip():
+                yield text
+
+def iter_docx_paragraphs(source):
+    """Yield paragraph texts from word/document.xml in document order"""
+    with zipfile.ZipFile(source) as archive:
+        with archive.open("word/document.xml") as stream:
+            yield from _iter_paragraphs(stream, f"{{{W_NS}}}p", f"{{{W_NS}}}t", DOCX_BREAKS)
+
+def _slide_parts(archive):
+    """Slide part names in presentation order, from presentation.xml and its rels"""
+    with archive.open("ppt/_rels/presentation.xml.rels") as stream:
+        rels = {
+            rel.get("Id"): rel.get("Target")
+            for rel in ET.parse(stream).getroot().iter(f"{{{PKG_REL_NS}}}Relationship")
+        }
+    with archive.open("ppt/presentation.xml") as stream:
+        root = ET.parse(stream).getroot()
+    parts = []
+    for slide_id in root.iter(f"{{{P_NS}}}sldId"):
+        target = rels[slide_id.get(f"{{{R_NS}}}id")]
+        if target.startswith("/"):
+            parts.append(target.lstrip("/"))
+        else:
+            parts.append(posixpath.normpath(posixpath.join("ppt", target)))
+    return parts
+
+def iter_pptx_paragraphs(source, select=None):
+    """Yield (slide index, paragraph text) slide by slide, in presentation order.
+
+    `select`, if given, is called with the slide count and returns the
+    indices of the slides to read; the other slides are never parsed.
+    """
+    with zipfile.ZipFile(source) as archive:
+        parts = _slide_parts(archive)
+        indices = select(len(parts)) if select else range(len(parts))
+        for index in indices:
+            with archive.open(parts[index]) as stream:
+                for text in _iter_paragraphs(stream, f"{{{A_NS}}}p", f"{{{A_NS}}}t", PPTX_BREAKS):
+                    yield index, text
@@ -0,0 +1,174 @@
+import time
+import itertools
+from queue import Queue, PriorityQueue, Empty
+from threading import Thread, Lock, Timer
+
+# Returned by a stage for an item it handed to Pipeline.requeue(): the item
+# is still in flight, so it is neither forwarded nor marked finished.
+DEFERRED = object()
+
+
+class Stage:
+    """A pipeline stage: a pool of worker threads draining one input queue.
+
+    `func` receives an item and returns the item to hand to the next stage,
+    or None when the item is finished (or was dropped) at this stage.
+
+    With batch_size > 1, `func` instead receives a list of up to batch_size
+    items (collected for at most batch_timeout seconds) and returns a list
+    of per-item results, or None when all of them are finished.
+
+    With `priority`, items are taken in order of arrival time plus
+    priority(item) seconds rather than FIFO: cheap items overtake costly
+    ones, but an item is never overtaken by anything that arrives more
+    than its priority later, so nothing starves.
+
+    With `lane` and lane_workers > 0, items for which lane(item) is true
+    go to a side queue served only by lane_workers dedicated threads. The
+    side queue is unbounded, so a run of lane items never blocks the
+    previous stage's threads from feeding the shared queue.
+    """
+
+    def __init__(self, name, func, workers=1, maxsize=0, batch_size=1, batch_timeout=1.0,
+                 priority=None, lane=None, lane_workers=0):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+        self.priority = priority
+        self.queue = PriorityQueue(maxsize=maxsize) if priority else Queue(maxsize=maxsize)
+        self.lane = lane if lane_workers > 0 else None
+        self.lane_workers = int(lane_workers) if self.lane else 0
+        self.lane_queue = (PriorityQueue() if priority else Queue()) if self.lane else None
+        self.batch_size = max(1, int(batch_size))
+        self.batch_timeout = batch_timeout
+        self._sequence = itertools.count()
+
+    def put(self, item):
+        """Queue an item; blocks while its queue is full (backpressure)"""
+        queue = self.lane_queue if self.lane and self.lane(item) else self.queue
+        if self.priority:
+            key = time.monotonic() + self.priority(item)
+            queue.put((key, next(self._sequence), item))
+        else:
+            queue.put(item)
+
+    def _get(self, queue, timeout=None):
+        entry = queue.get(timeout=timeout)
+        return entry[2] if self.priority else entry
+
+    def take(self, queue=None):
+        """Block for one item, then gather more up to batch_size/batch_timeout"""
+        queue = queue or self.queue
+        items = [self._get(queue)]
+        deadline = time.monotonic() + self.batch_timeout
+        while len(items) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._get(queue, timeout=remaining))
+            except Empty:
+                break
+        return items
+
+    def qsize(self):
+        return self.queue.qsize() + (self.lane_queue.qsize() if self.lane else 0)
+
+
+class Pipeline:
+    """Stages connected by bounded queues, each with its own worker count.
+
+    Only the first stage's queue should be unbounded: it holds lightweight job
+    rows, while later queues hold downloaded files and extracted text, so their
+    bounds are what cap memory and temp-disk usage.
+
+    `on_finish`, if given, is called with each item as it leaves the
+    pipeline, whether finished, dropped or failed with an exception.
+    """
+
+    def __init__(self, stages, on_finish=None):
+        self.stages = stages
+        self.on_finish = on_finish
+        self._threads = []
+        self._lock = Lock()
+        self._in_flight = 0
+        self._started = False
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            for index, stage in enumerate(self.stages):
+                for n in range(stage.workers):
+                    thread = Thread(target=self._run_stage, args=(index, stage.queue),
+                                    name=f"{stage.name}-{n}", daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+                for n in range(stage.lane_workers):
+                    thread = Thread(target=self._run_stage, args=(index, stage.lane_queue),
+                                    name=f"{stage.name}-lane-{n}", daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+            self._started = True
+
+    def submit(self, item):
+        with self._lock:
+            self._in_flight += 1
+        self.stages[0].put(item)
+
+    def _finish(self, item):
+        with self._lock:
+            self._in_flight -= 1
+        if self.on_finish is not None:
+            try:
+                self.on_finish(item)
+            except Exception as e:
+                print(f"[✗] Pipeline finish callback failed: {e}")
+
+    def _run_stage(self, index, queue):
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        while True:
+            items = stage.take(queue)
+            try:
+                if stage.batch_size > 1:
+                    results = stage.func(items) or [None] * len(items)
+                else:
+                    results = [stage.func(items[0])]
+            except Exception as e:
+                print(f"[✗] Stage {stage.name} failed: {e}")
+                results = [None] * len(items)
+            try:
+                for item, result in zip(items, results):
+                    if result is DEFERRED:
+                        continue
+                    if result is not None and next_stage is not None:
+                        # Blocks while the next stage is saturated (backpressure)
+                        next_stage.put(result)
+                    else:
+                        self._finish(item)
+            finally:
+                for _ in items:
+                    queue.task_done()
+
+    def requeue(self, item, stage_name, delay=0):
+        """Put an in-flight item back on a stage's queue after `delay` seconds"""
+        stage = next(stage for stage in self.stages if stage.name == stage_name)
+        timer = Timer(delay, stage.put, args=(item,))
+        timer.daemon = True
+        timer.start()
+
+    @property
+    def started(self):
+        return self._started
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    @property
+    def active(self):
+        return self._in_flight > 0
+
+    def queue_sizes(self):
+        return {stage.name: stage.qsize() for stage in self.stages}
@@ -0,0 +1,143 @@
+"""On-demand profiling of the next N jobs.
+
+A session samples the stacks of the pipeline's stage threads every
+PROFILE_SAMPLE_INTERVAL seconds and diffs tracemalloc snapshots taken at
+its start and end. It ends once N jobs have completed (or after
+PROFILE_MAX_SECONDS). Sampling works across threads on every Python
+version and costs little, unlike leaving cProfile on.
+"""
+import os
+import sys
+import hmac
+import time
+import threading
+import tracemalloc
+from collections import Counter
+
+from jobstats import job_log
+
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.01"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "900"))
+PROFILE_TOP = 25
+# Stage threads are named <stage>-<n> by Pipeline.start()
+PROFILED_THREAD_PREFIXES = ("download-", "extract-", "summarize-")
+# A stage thread inside Stage.take() is idle, waiting for work
+IDLE_FRAME = "take (pipeline.py"
+# Admin endpoints are disabled unless a token is configured
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+def authorized(token):
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token or "", ADMIN_TOKEN)
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+class ProfileSession:
+    def __init__(self, jobs, interval=PROFILE_SAMPLE_INTERVAL, max_seconds=PROFILE_MAX_SECONDS):
+        self.jobs = jobs
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.started_at = None
+        self.finished_at = None
+        self.samples = 0
+        self.stacks = Counter()
+        self.leaf_functions = Counter()
+        self.job_timings = []
+        self.memory = []
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._started_tracemalloc = False
+
+    @property
+    def running(self):
+        return self.started_at is not None and self.finished_at is None
+
+    def start(self):
+        self.started_at = time.time()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self._started_tracemalloc = True
+        self._snapshot = tracemalloc.take_snapshot()
+        job_log.add_listener(self._job_completed)
+        threading.Thread(target=self._sample, name="profile-sampler", daemon=True).start()
+
+    def _job_completed(self, timings):
+        with self._lock:
+            self.job_timings.append(timings.as_dict())
+            if len(self.job_timings) >= self.jobs:
+                self._done.set()
+
+    def _sample(self):
+        deadline = time.monotonic() + self.max_seconds
+        try:
+            while not self._done.wait(self.interval) and time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if not names.get(ident, "").startswith(PROFILED_THREAD_PREFIXES):
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    if any(label.startswith(IDLE_FRAME) for label in stack):
+                        continue
+                    with self._lock:
+                        self.leaf_functions[stack[0]] += 1
+                        self.stacks[";".join(reversed(stack))] += 1
+                        self.samples += 1
+        finally:
+            self._stop()
+
+    def _stop(self):
+        job_log.remove_listener(self._job_completed)
+        snapshot = tracemalloc.take_snapshot()
+        self.memory = [str(stat) for stat in snapshot.compare_to(self._snapshot, "lineno")[:PROFILE_TOP]]
+        self._snapshot = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        self.finished_at = time.time()
+
+    def results(self):
+        with self._lock:
+            return self._results()
+
+    def _results(self):
+        total = self.samples or 1
+        return {
+            "running": self.running,
+            "jobs_requested": self.jobs,
+            "jobs_profiled": len(self.job_timings),
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "samples": self.samples,
+            "sample_interval_s": self.interval,
+            # Share of samples where the stage thread was inside this function
+            "top_functions": [
+                {"function": name, "samples": count, "share": round(count / total, 4)}
+                for name, count in self.leaf_functions.most_common(PROFILE_TOP)
+            ],
+            # Collapsed stacks, ready for flamegraph.pl / speedscope
+            "collapsed_stacks": [f"{stack} {count}" for stack, count in self.stacks.most_common(PROFILE_TOP * 4)],
+            "memory_growth": self.memory,
+            "jobs": list(self.job_timings),
+        }
+
+_session = None
+_session_lock = threading.Lock()
+
+def start_profile(jobs):
+    """Profile the next `jobs` jobs; returns None while a session is running"""
+    global _session
+    with _session_lock:
+        if _session is not None and _session.running:
+            return None
+        _session = ProfileSession(max(1, int(jobs)))
+        _session.start()
+        return _session
+
+def profile_results():
+    """Results of the running or most recent session, or None"""
+    session = _session
+    return session.results() if session is not None else None
@@ -0,0 +1,77 @@
+import time
+from threading import Condition, Lock
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `per_minute` tokens per minute.
+
+    acquire() blocks until the requested amount is available. Requests larger
+    than the capacity are let through once the bucket is full, so a single
+    oversized call cannot block forever.
+    """
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1):
+        if self.rate <= 0:
+            return
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveConcurrency:
+    """AIMD concurrency limit: +1 per limit's worth of successes, halved on throttling.
+
+    Use as a context manager around each call; callers block while the number
+    of calls in progress is at the current limit.
+    """
+
+    def __init__(self, initial=1, maximum=8, minimum=1):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self._in_use = 0
+        self._cond = Condition()
+
+    def __enter__(self):
+        with self._cond:
+            while self._in_use >= int(self.limit):
+                self._cond.wait()
+            self._in_use += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify_all()
+        return False
+
+    def on_success(self):
+        with self._cond:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    def on_throttle(self):
+        with self._cond:
+            self.limit = max(self.minimum, self.limit / 2)
+
+    @property
+    def in_use(self):
+        return self._in_use
@@ -0,0 +1,36 @@
+"""Job cost estimates for cheapest-first scheduling.
+
+Costs are rough seconds of work. Stage queues order items by arrival
+time + SCHEDULE_COST_WEIGHT * cost (see pipeline.Stage), so a job is
+overtaken by cheaper ones for at most that many seconds of arrivals and
+never starves.
+"""
+import os
+
+SCHEDULE_COST_WEIGHT = float(os.getenv("SCHEDULE_COST_WEIGHT", "5"))
+# Fixed per-type overhead: parsing, and LibreOffice conversion for legacy formats
+BASE_COST = {
+    ".txt": 0.05,
+    ".docx": 0.2,
+    ".pptx": 0.3,
+    ".pdf": 0.3,
+}
+LEGACY_COST = 3.0
+UNKNOWN_COST = 1.0
+COST_PER_MB = 0.05
+COST_PER_PAGE = 0.01
+OCR_PAGE_COST = float(os.getenv("OCR_PAGE_COST", "2"))
+
+def base_cost(ext, legacy=False):
+    return LEGACY_COST if legacy else BASE_COST.get(ext, UNKNOWN_COST)
+
+def extraction_cost(ext, size=0, page_count=0, ocr_pages=0, legacy=False):
+    """Estimated seconds to extract an excerpt from a downloaded file"""
+    return (base_cost(ext, legacy)
+            + COST_PER_MB * size / (1024 * 1024)
+            + COST_PER_PAGE * page_count
+            + OCR_PAGE_COST * ocr_pages)
+
+def priority(cost):
+    """Seconds of arrivals a job with this cost yields to"""
+    return SCHEDULE_COST_WEIGHT * cost
@@ -0,0 +1,22 @@
+from excerpt import sample_paragraphs
+
+
+def test_one_giant_paragraph_is_cut_to_the_scan_budget():
+    units = sample_paragraphs(["ab " * 25000], scan_words=20000)
+    assert [section for section, _ in units] == [0]
+    assert len(units[0][1].split()) == 20000
+
+
+def test_giant_first_paragraph_does_not_stall_later_chunks():
+    paragraphs = ["ab " * 25000] + ["cd " * 50] * 100
+    units = sample_paragraphs(paragraphs, scan_words=20000, chunk_words=400)
+    assert sum(len(text.split()) for _, text in units) <= 20000 + 400
+
+
+def test_sample_spans_the_whole_document():
+    paragraphs = [f"p{i} " + "w " * 49 for i in range(5000)]
+    units = sample_paragraphs(paragraphs, scan_words=20000, chunk_words=400)
+    sections = sorted({section for section, _ in units})
+    assert sum(len(text.split()) for _, text in units) <= 20000
+    assert sections[0] == 0
+    assert sections[-1] >= 600
@@ -0,0 +1,896 @@
+"""Description worker: downloads notes, extracts an excerpt and asks the LLM
+for a description. Runs standalone with `python -m worker_main`, separate
+from the web tier, and any number of worker processes can share one
+database."""
+import os
+import re
+import ooxml
+from excerpt import (EXCERPT_SCAN_WORDS, EXCERPT_TOKEN_BUDGET, budget_words,
+                     sample_pages, sample_paragraphs, select_excerpt)
+import random
+import platform
+import shutil
+import signal
+import argparse
+import threading
+from threading import Thread, Lock, Event
+import database as db
+from pipeline import Pipeline, Stage, DEFERRED
+from governor import governor
+import scheduling
+from jobstats import JobTimings, job_log
+import profiling
+from libreoffice import LEGACY_FORMATS, ConversionError, ConversionTimeout, office_pool
+import llm
+from llm import LLM_BATCH_SIZE, LLMError, generate_description_from_text, generate_descriptions_batch
+from downloader import engine as download_engine, total_size
+import requests
+import metrics
+import io
+import json
+import hashlib
+import time
+# import tempfile
+
+# Set temp directory path early so it's available everywhere
+TEMP_DIR = os.path.join(os.path.dirname(__file__), 'temp') if platform.system() == 'Windows' else '/tmp/notesup_temp'
+
+DRIVE_DOWNLOAD_URL = os.getenv("DRIVE_DOWNLOAD_URL", "https://drive.google.com/uc?export=download")
+
+# Per-stage worker counts; later stages hand off through bounded queues
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "8"))
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 2)))
+SUMMARIZE_WORKERS = int(os.getenv("SUMMARIZE_WORKERS", "2"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+# Failed LLM calls are re-queued with doubling delays, then dropped. The cap
+# keeps each wait well inside the job's lease (CLAIM_LEASE_SECONDS).
+LLM_JOB_MAX_ATTEMPTS = int(os.getenv("LLM_JOB_MAX_ATTEMPTS", "5"))
+LLM_REQUEUE_DELAY = float(os.getenv("LLM_REQUEUE_DELAY", "30"))
+LLM_REQUEUE_MAX_DELAY = float(os.getenv("LLM_REQUEUE_MAX_DELAY", "240"))
+# PDF page planning: pages below MIN_TEXT_LAYER_WORDS are OCR candidates if
+# images cover at least MIN_IMAGE_COVERAGE of them
+MIN_TEXT_LAYER_WORDS = int(os.getenv("MIN_TEXT_LAYER_WORDS", "5"))
+MIN_IMAGE_COVERAGE = float(os.getenv("MIN_IMAGE_COVERAGE", "0.3"))
+PDF_MAX_OCR_PAGES = int(os.getenv("PDF_MAX_OCR_PAGES", "6"))
+# Failures no retry can fix: the job goes straight to 'failed'
+PERMANENT_ERRORS = ("too_large", "unsupported_type")
+# Leading PDF pages whose text layer is checked to spot scans before extraction
+PROBE_PAGES = int(os.getenv("PROBE_PAGES", "3"))
+# Extract threads reserved for likely-OCR jobs (0: they share the extract pool)
+EXTRACT_OCR_LANE_WORKERS = int(os.getenv("EXTRACT_OCR_LANE_WORKERS", "0"))
+# Hard cap on bytes fetched per file, and the prefix fetched for TXT files
+DOWNLOAD_MAX_BYTES = int(os.getenv("DOWNLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+TXT_FETCH_BYTES = int(os.getenv("TXT_FETCH_BYTES", str(256 * 1024)))
+# Downloads larger than this spill from memory to TEMP_DIR
+SPOOL_MAX_BYTES = int(os.getenv("SPOOL_MAX_BYTES", str(8 * 1024 * 1024)))
+
+processed_count = 0
+processed_lock = Lock()
+cache_ready = False
+
+# Backlog is claimed in keyset pages; claiming pauses above this many jobs
+BACKLOG_BATCH_SIZE = int(os.getenv("BACKLOG_BATCH_SIZE", "100"))
+BACKLOG_MAX_IN_FLIGHT = int(os.getenv("BACKLOG_MAX_IN_FLIGHT", "200"))
+# Jobs this worker has claimed and not yet finished; their leases are renewed
+leases = set()
+leases_lock = Lock()
+
+# Standalone worker loop: how often an idle worker polls for claimable jobs,
+# how often one worker re-scans for notes missing a job, and how long
+# shutdown waits for in-flight jobs. With WORKER_LISTEN, new uploads arrive
+# through LISTEN/NOTIFY and the re-scan is only a slow reconciliation sweep.
+WORKER_LISTEN = os.getenv("WORKER_LISTEN", "1") == "1"
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "5"))
+WORKER_SWEEP_INTERVAL = float(os.getenv("WORKER_SWEEP_INTERVAL", "900" if WORKER_LISTEN else "60"))
+WORKER_LISTEN_RETRY = float(os.getenv("WORKER_LISTEN_RETRY", "10"))
+WORKER_DRAIN_TIMEOUT = float(os.getenv("WORKER_DRAIN_TIMEOUT", "60"))
+# Pipeline metrics (downloads, OCR, LLM, queues) live only in worker processes
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9100"))
+# Advisory lock keys shared by every worker process
+SCHEMA_LOCK = "notesup:schema"
+SWEEP_LOCK = "notesup:sweep"
+stop_event = Event()
+wake_event = Event()
+
+# Heavy backends, imported by load_pdf_backend() on the first PDF
+fitz = None
+ocr = None
+# Startup self-checks, filled in by check_readiness() in the background
+readiness = {}
+
+def clean_text(text):
+    return re.sub(r'\s+', ' ', text).strip()
+
+def load_pdf_backend():
+    """Import PyMuPDF and the OCR module on first use"""
+    global fitz, ocr
+    if ocr is None:
+        import fitz  # PyMuPDF
+        import ocr
+
+def open_pdf(source):
+    """Open a PDF from a temp file path or from in-memory bytes"""
+    load_pdf_backend()
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype="pdf")
+
+def as_stream(source):
+    """python-docx/python-pptx accept either a path or a file-like object"""
+    return source if isinstance(source, str) else io.BytesIO(source)
+
+def open_text(source):
+    if isinstance(source, str):
+        return open(source, 'r', encoding='utf-8')
+    return io.TextIOWrapper(io.BytesIO(source), encoding='utf-8', errors='replace')
+
+def read_source(source):
+    if isinstance(source, bytes):
+        return source
+    with open(source, 'rb') as f:
+        return f.read()
+
+def classify_pdf_page(doc, page):
+    """Cheaply classify a page as 'text', 'image' or 'blank'.
+
+    Returns (kind, text, score). Text-layer pages carry their text; image
+    pages get a content-density score from how much of the page their
+    images cover and how many compressed bytes they hold per unit area
+    (blank or cover-like scans compress far smaller than dense notes).
+    """
+    text = page.get_text()
+    if len(text.split()) >= MIN_TEXT_LAYER_WORDS:
+        return 'text', text, 0.0
+
+    page_area = abs(page.rect) or 1.0
+    covered = 0.0
+    image_bytes = 0
+    for info in page.get_image_info(xrefs=True):
+        covered += abs(fitz.Rect(info['bbox']) & page.rect)
+        if info.get('xref'):
+            try:
+                image_bytes += len(doc.xref_stream_raw(info['xref']) or b'')
+            except Exception:
+                pass
+    coverage = min(1.0, covered / page_area)
+    if coverage < MIN_IMAGE_COVERAGE:
+        # A few stray words with no scan behind them are still worth keeping
+        return ('text', text, 0.0) if text.strip() else ('blank', '', 0.0)
+    return 'image', text, coverage * (image_bytes / page_area)
+
+def extract_text_pdf(source, scan_words=EXCERPT_SCAN_WORDS):
+    """Collect page texts sampled across the PDF, OCRing only the most content-dense image pages.
+
+    Up to EXCERPT_MAX_PAGES pages spread over the document are read, and
+    their text layers are used wherever they exist. If those hold fewer
+    words than the excerpt budget needs, image-only pages are OCR'd in order
+    of content density (at most PDF_MAX_OCR_PAGES). Returns (page, text)
+    units in page order.
+    """
+    doc = None
+    try:
+        doc = open_pdf(source)
+        page_texts = {}
+        image_pages = []
+        text_words = 0
+        
+        for page_num in sample_pages(len(doc)):
+            kind, text, score = classify_pdf_page(doc, doc[page_num])
+            if kind == 'text':
+                page_texts[page_num] = text
+                text_words += len(text.split())
+                if text_words >= scan_words:
+                    break
+            elif kind == 'image':
+                image_pages.append((score, page_num))
+        
+        needed = budget_words()
+        if text_words < needed and image_pages:
+            # Densest pages first; a cover page rarely wins this ranking
+            ranked = [page_num for _, page_num in sorted(image_pages, key=lambda p: (-p[0], p[1]))]
+            try:
+                page_texts.update(ocr.ocr_pages(doc, ranked[:PDF_MAX_OCR_PAGES], needed - text_words, dpi=150))
+            except ocr.OCRError as e:
+                # Not "no text found": a placeholder would be saved for good
+                raise ExtractionError("ocr_failed") from e
+
+        units = [(page_num, clean_text(page_texts[page_num]))
+                 for page_num in sorted(page_texts) if page_texts[page_num].strip()]
+        return units or [(0, "No text found in the PDF.")]
+    
+    finally:
+        if doc:
+            doc.close()
+
+def take_units(units, scan_words):
+    """Collect (section, text) units with non-empty text, stopping at scan_words"""
+    taken = []
+    words = 0
+    for section, text in units:
+        text = clean_text(text)
+        if not text:
+            continue
+        taken.append((section, text))
+        words += len(text.split())
+        if words >= scan_words:
+            break
+    return taken
+
+def extract_text_docx(source, scan_words=EXCERPT_SCAN_WORDS):
+    """Stream paragraphs from word/document.xml; python-docx for malformed files"""
+    try:
+        return sample_paragraphs(ooxml.iter_docx_paragraphs(as_stream(source)), scan_words)
+    except ooxml.MALFORMED_ERRORS as e:
+        print(f"Streaming DOCX reader failed, falling back to python-docx: {e}")
+        return extract_text_docx_full(source, scan_words)
+
+def extract_text_docx_full(source, scan_words=EXCERPT_SCAN_WORDS):
+    """Extract text from DOCX with memory management"""
+    doc = None
+    try:
+        from docx import Document
+        doc = Document(as_stream(source))
+        return sample_paragraphs((para.text for para in doc.paragraphs), scan_words)
+    
+    finally:
+        if doc:
+            del doc
+
+def extract_text_pptx(source, scan_words=EXCERPT_SCAN_WORDS):
+    """Stream text from slides sampled across the deck; python-pptx for malformed files"""
+    try:
+        return take_units(ooxml.iter_pptx_paragraphs(as_stream(source), select=sample_pages), scan_words)
+    except ooxml.MALFORMED_ERRORS as e:
+        print(f"Streaming PPTX reader failed, falling back to python-pptx: {e}")
+        return extract_text_pptx_full(source, scan_words)
+
+def extract_text_pptx_full(source, scan_words=EXCERPT_SCAN_WORDS):
+    """Extract text from PPTX with memory management"""
+    prs = None
+    try:
+        from pptx import Presentation
+        prs = Presentation(as_stream(source))
+        slides = list(prs.slides)
+        return take_units(((slide_num, shape.text)
+                           for slide_num in sample_pages(len(slides))
+                           for shape in slides[slide_num].shapes if hasattr(shape, "text")),
+                          scan_words)
+    
+    finally:
+        if prs:
+            del prs
+
+def extract_text_txt(source, scan_words=EXCERPT_SCAN_WORDS):
+    """Extract text from TXT with memory management"""
+    with open_text(source) as f:
+        return sample_paragraphs(f, scan_words)
+
+class ExtractionError(Exception):
+    def __init__(self, error_class):
+        super().__init__(error_class)
+        self.error_class = error_class
+
+def load_pdf_extractor():
+    load_pdf_backend()
+    return extract_text_pdf
+
+# Extension -> loader returning its extractor. DOCX/PPTX/TXT need nothing
+# heavy; python-docx/python-pptx are only imported by the malformed-file
+# fallbacks.
+EXTRACTOR_LOADERS = {
+    '.pdf': load_pdf_extractor,
+    '.docx': lambda: extract_text_docx,
+    '.pptx': lambda: extract_text_pptx,
+    '.txt': lambda: extract_text_txt,
+}
+_extractors = {}
+_extractors_lock = Lock()
+
+def get_extractor(ext):
+    """Extractor for `ext`, importing its backend the first time it is needed"""
+    extractor = _extractors.get(ext)
+    if extractor is None:
+        loader = EXTRACTOR_LOADERS.get(ext)
+        if loader is None:
+            raise ExtractionError("unsupported_type")
+        with _extractors_lock:
+            extractor = _extractors[ext] = loader()
+    return extractor
+
+def extract_text_from_file(source, token_budget=EXCERPT_TOKEN_BUDGET, file_name=None):
+    """Extract a representative excerpt from a temp file path or in-memory bytes.
+
+    Text is sampled across the whole document and the most informative,
+    non-repeating parts are packed into `token_budget` (see excerpt.py).
+    `file_name` supplies the extension when `source` is bytes.
+    Raises ExtractionError, whose error_class says what went wrong.
+    """
+    ext = os.path.splitext(file_name or source)[1].lower()
+    
+    start = time.perf_counter()
+    try:
+        kind = ext
+        if ext in LEGACY_FORMATS:
+            # .doc/.ppt/.odt etc. go through a warm LibreOffice instance first
+            source, kind = office_pool.convert(read_source(source), ext)
+
+        units = get_extractor(kind)(source, EXCERPT_SCAN_WORDS)
+        return select_excerpt(units, token_budget)
+        
+    except ExtractionError:
+        raise
+    except ConversionTimeout as e:
+        raise ExtractionError("conversion_timeout") from e
+    except ConversionError as e:
+        raise ExtractionError("conversion_failed") from e
+    except Exception as e:
+        print(f"Error in extract_text_from_file: {e}")
+        raise ExtractionError("extract_failed") from e
+    
+    finally:
+        metrics.extract_duration.observe(time.perf_counter() - start, ext=ext or "none")
+
+# Test function to verify Tesseract installation
+def test_tesseract():
+    """Test if Tesseract is properly installed and accessible"""
+    img = None
+    try:
+        # Create a simple test image with text
+        from PIL import Image, ImageDraw, ImageFont
+        import pytesseract
+        # Importing ocr points pytesseract at the tesseract binary
+        load_pdf_backend()
+        
+        # Create a simple image with text
+        img = Image.new('RGB', (200, 100), color='white')
+        draw = ImageDraw.Draw(img)
+        draw.text((10, 10), "Test OCR", fill='black')
+        
+        # Test OCR
+        text = pytesseract.image_to_string(img)
+        print(f"Tesseract test successful. Detected text: '{text.strip()}'")
+        return True
+        
+    except Exception as e:
+        print(f"Tesseract test failed: {e}")
+        return False
+    
+    finally:
+        if img:
+            img.close()
+
+class DownloadError(Exception):
+    def __init__(self, error_class):
+        super().__init__(error_class)
+        self.error_class = error_class
+
+class FileTooLarge(ValueError):
+    pass
+
+def classify_download_error(error):
+    """Map a download exception to an error class for the job's failure record"""
+    if isinstance(error, FileTooLarge):
+        return "too_large"
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        if status in (404, 410):
+            return "not_found"
+        if status in (401, 403):
+            return "forbidden"
+        return "http_error"
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return "network"
+    return "download_failed"
+
+def download_limit(file_name):
+    """Bytes worth fetching for this file type, and whether a cut-off file is still usable.
+
+    A TXT prefix holds the first words we need, and MuPDF can repair a
+    truncated PDF well enough to read its leading pages; zip-based and
+    legacy formats need the whole file, so they are rejected past the limit
+    instead of cut off.
+    """
+    ext = os.path.splitext(file_name)[1].lower()
+    if ext == '.txt':
+        return min(TXT_FETCH_BYTES, DOWNLOAD_MAX_BYTES), True
+    if ext == '.pdf':
+        return DOWNLOAD_MAX_BYTES, True
+    return DOWNLOAD_MAX_BYTES, False
+
+def download_file_from_google_drive(file_id, file_name):
+    """Downloads a file using its Google Drive file ID.
+
+    Files up to SPOOL_MAX_BYTES stay in memory and are returned as bytes;
+    larger ones spill to a file in temp/ and its path is returned instead.
+    Returns (source, sha256_hexdigest), hashing the bytes as they stream.
+    Downloads stop at the type's byte limit (see download_limit).
+    Raises DownloadError, whose error_class says whether retrying can help.
+    """
+    limit, truncatable = download_limit(file_name)
+    # Files that can't be cut off ask for one byte past the limit, so an
+    # oversized one shows up even when the server honours the Range header
+    fetch_bytes = limit if truncatable else limit + 1
+    random_suffix = random.randint(100000, 999999)
+    temp_name = f"{random_suffix}_{file_name}"
+
+    digest = hashlib.sha256()
+    buffer = io.BytesIO()
+    f = None
+    file_path = None
+    received = 0
+    
+    try:
+        with download_engine.get(DRIVE_DOWNLOAD_URL, params={'id': file_id}, max_bytes=fetch_bytes) as response:
+            size = total_size(response)
+            if not truncatable and size is not None and size > limit:
+                raise FileTooLarge(f"{file_name} is {size} bytes, over DOWNLOAD_MAX_BYTES ({limit} bytes)")
+            for chunk in response.iter_content(32768):
+                if not chunk:
+                    continue
+                if received + len(chunk) > limit:
+                    if not truncatable:
+                        raise FileTooLarge(f"{file_name} exceeds DOWNLOAD_MAX_BYTES ({limit} bytes)")
+                    chunk = chunk[:limit - received]
+                received += len(chunk)
+                digest.update(chunk)
+                metrics.download_bytes.inc(len(chunk))
+                if f is None and buffer.tell() + len(chunk) > SPOOL_MAX_BYTES:
+                    # Too large to keep in memory: spill what we have to disk
+                    os.makedirs(TEMP_DIR, exist_ok=True)
+                    file_path = os.path.join(TEMP_DIR, temp_name)
+                    f = open(file_path, "wb")
+                    f.write(buffer.getbuffer())
+                    buffer = None
+                (f or buffer).write(chunk)
+                if truncatable and received >= limit:
+                    break
+
+        if f is not None:
+            f.close()
+            print(f"[✓] File downloaded to {file_path}")
+            return file_path, digest.hexdigest()
+        print(f"[✓] File downloaded to memory ({received} bytes)")
+        return buffer.getvalue(), digest.hexdigest()
+        
+    except Exception as e:
+        print("[✗] Error while downloading the file:", e)
+        if f is not None:
+            f.close()
+            remove_temp_file(file_path)
+        raise DownloadError(classify_download_error(e)) from e
+    
+def start_worker_if_needed():
+    global cache_ready
+    if not cache_ready:
+        # Workers starting together would race on CREATE TABLE/INDEX
+        with db.advisory_lock(SCHEMA_LOCK):
+            db.ensure_file_path_index()
+            db.ensure_job_table()
+            db.ensure_upload_trigger()
+            cache_ready = db.ensure_content_cache_table()
+    pipeline.start()
+
+class DescriptionJob:
+    """State for one note as it moves through the pipeline stages"""
+    def __init__(self, note):
+        self.note = note
+        self.file_id = note.file_path
+        self.file_name = note.filename
+        self.source = None
+        self.sha256 = None
+        self.text = None
+        self.llm_attempts = 0
+        self.timings = JobTimings(self.file_id, self.file_name)
+        self.ext = os.path.splitext(self.file_name)[1].lower()
+        # Filled in by probe_document() once the file is downloaded
+        self.size = 0
+        self.page_count = 0
+        self.ocr_pages = 0
+        self.extract_cost = 0.0
+
+def finish_job(job, outcome):
+    """Count the job's outcome and file its stage timings"""
+    metrics.jobs_completed.inc(outcome=outcome)
+    job_log.finish(job.timings, outcome)
+
+def fail_job(job, error_class, detail=None):
+    """Record a failure; the job cools down before it can be claimed again"""
+    finish_job(job, error_class)
+    db.mark_job_failed(job.file_id, error_class, detail=detail and detail[:500],
+                       permanent=error_class in PERMANENT_ERRORS)
+    return None
+
+def remove_temp_file(temp_path):
+    """Delete a spilled download; in-memory sources need no cleanup"""
+    if isinstance(temp_path, str) and os.path.exists(temp_path):
+        try:
+            os.remove(temp_path)
+        except Exception as e:
+            print(f"Failed to remove temp file {temp_path}: {e}")
+
+def download_stage(job):
+    """Pipeline stage 1: fetch the Drive file into memory (or TEMP_DIR)"""
+    if job.ext not in EXTRACTOR_LOADERS and job.ext not in LEGACY_FORMATS:
+        # Nothing could read it; don't spend a download finding that out
+        return fail_job(job, "unsupported_type")
+    start = time.perf_counter()
+    try:
+        with job.timings.measure("download"):
+            job.source, job.sha256 = download_file_from_google_drive(job.file_id, job.file_name)
+    except DownloadError as e:
+        return fail_job(job, e.error_class, detail=str(e.__cause__))
+    finally:
+        metrics.download_duration.observe(time.perf_counter() - start)
+
+    # Same bytes seen before under another Drive ID: reuse the earlier work
+    cached = db.get_cached_content(job.sha256) if cache_ready else None
+    if cached and cached.description:
+        remove_temp_file(job.source)
+        job.source = None
+        finish_job(job, "cache_hit")
+        db.summary_writer.add(drive_file_path=job.file_id, summary=cached.description)
+        print(f"[✓] Summary reused from cache for file {job.file_name}")
+        return None
+    if cached and cached.excerpt:
+        remove_temp_file(job.source)
+        job.source = None
+        job.text = cached.excerpt
+        return job
+    probe_document(job)
+    return job
+
+def probe_document(job):
+    """Cheaply size up a downloaded file: bytes, page count, likely OCR pages.
+
+    For PDFs only the first PROBE_PAGES pages' text layers are read; if they
+    are nearly empty the document is treated as a scan.
+    """
+    source = job.source
+    job.size = len(source) if isinstance(source, bytes) else os.path.getsize(source)
+    if job.ext == '.pdf':
+        doc = None
+        try:
+            doc = open_pdf(source)
+            job.page_count = len(doc)
+            probed = min(job.page_count, PROBE_PAGES)
+            words = sum(len(doc[page_num].get_text().split()) for page_num in range(probed))
+            if probed and words < MIN_TEXT_LAYER_WORDS * probed:
+                job.ocr_pages = min(job.page_count, PDF_MAX_OCR_PAGES)
+        except Exception:
+            pass
+        finally:
+            if doc:
+                doc.close()
+    job.extract_cost = scheduling.extraction_cost(job.ext, job.size, job.page_count, job.ocr_pages,
+                                                  legacy=job.ext in LEGACY_FORMATS)
+
+def estimate_extraction_cost(job):
+    """Estimated peak bytes to extract this job, from file size and page count.
+
+    OCR is only counted for PDFs probe_document() found to be scans.
+    """
+    return governor.estimate(job.size, job.ext, page_count=job.page_count,
+                             ocr_pages=min(job.ocr_pages, ocr.OCR_PREFETCH if ocr else 0))
+
+def extract_stage(job):
+    """Pipeline stage 2: extract an excerpt and release the download"""
+    if job.text is not None:
+        # Excerpt already known from the content cache
+        return job
+    try:
+        # Defer while this file's estimated footprint would exceed the memory budget
+        with governor.admit(estimate_extraction_cost(job)), job.timings.measure("extract"):
+            job.text = extract_text_from_file(job.source, file_name=job.file_name)
+    except ExtractionError as e:
+        # Not a placeholder description: the job is retried, or fails for good
+        print(f"[✗] Extraction failed for {job.file_name}: {e.error_class}")
+        return fail_job(job, e.error_class, detail=str(e.__cause__ or e))
+    finally:
+        remove_temp_file(job.source)
+        job.source = None
+    if job.text and cache_ready:
+        db.save_cached_content(job.sha256, excerpt=job.text)
+    return job
+
+def save_description(job, description):
+    global processed_count
+    finish_job(job, "described")
+    db.summary_writer.add(drive_file_path=job.file_id, summary=description)
+    if description and cache_ready:
+        db.save_cached_content(job.sha256, description=description)
+    print(f"[✓] Summary queued for file {job.file_name}")
+
+    with processed_lock:
+        processed_count += 1
+    governor.maybe_collect()
+
+def retry_summary_later(job):
+    """Re-queue a job whose LLM call failed instead of saving a blank description"""
+    job.llm_attempts += 1
+    if job.llm_attempts > LLM_JOB_MAX_ATTEMPTS:
+        print(f"[✗] Giving up on summary for {job.file_name} after {job.llm_attempts} attempts")
+        return fail_job(job, "llm_failed")
+    delay = min(LLM_REQUEUE_DELAY * 2 ** (job.llm_attempts - 1), LLM_REQUEUE_MAX_DELAY)
+    print(f"[!] Summary for {job.file_name} re-queued in {delay:.0f}s")
+    pipeline.requeue(job, "summarize", delay=delay)
+    return DEFERRED
+
+def summarize_stage(job):
+    """Pipeline stage 3: generate the description and persist it"""
+    try:
+        with job.timings.measure("llm"):
+            description = generate_description_from_text(job.text)
+    except LLMError as e:
+        print(f"Error while generating summary for {job.file_name}: {e}")
+        return retry_summary_later(job)
+    save_description(job, description)
+    return None
+
+def summarize_batch_stage(jobs):
+    """Pipeline stage 3 in batching mode: one LLM request for several notes"""
+    start = time.perf_counter()
+    descriptions = generate_descriptions_batch({i: job.text for i, job in enumerate(jobs)})
+    elapsed = time.perf_counter() - start
+    results = []
+    for i, job in enumerate(jobs):
+        # The whole request's latency: that is how long each note waited on it
+        job.timings.add("llm", elapsed)
+        if descriptions[i] is None:
+            results.append(retry_summary_later(job))
+        else:
+            save_description(job, descriptions[i])
+            results.append(None)
+    return results
+
+if LLM_BATCH_SIZE > 1:
+    summarize = Stage("summarize", summarize_batch_stage, workers=SUMMARIZE_WORKERS,
+                      maxsize=max(PIPELINE_QUEUE_SIZE, LLM_BATCH_SIZE), batch_size=LLM_BATCH_SIZE)
+else:
+    summarize = Stage("summarize", summarize_stage, workers=SUMMARIZE_WORKERS,
+                      maxsize=PIPELINE_QUEUE_SIZE)
+
+def release_lease(job):
+    with leases_lock:
+        leases.discard(job.file_id)
+
+# Cheapest jobs first, with aging; before download only the type is known
+pipeline = Pipeline([
+    Stage("download", download_stage, workers=DOWNLOAD_WORKERS,
+          priority=lambda job: scheduling.priority(
+              scheduling.base_cost(job.ext, legacy=job.ext in LEGACY_FORMATS))),
+    Stage("extract", extract_stage, workers=EXTRACT_WORKERS, maxsize=PIPELINE_QUEUE_SIZE,
+          priority=lambda job: scheduling.priority(job.extract_cost),
+          lane=lambda job: job.ocr_pages > 0, lane_workers=EXTRACT_OCR_LANE_WORKERS),
+    summarize,
+], on_finish=release_lease)
+
+metrics.Gauge("notesup_queue_depth", "Items waiting in each pipeline stage queue",
+              func=pipeline.queue_sizes, label="stage")
+metrics.Gauge("notesup_jobs_in_flight", "Notes submitted to the pipeline and not yet finished",
+              func=lambda: pipeline.in_flight)
+metrics.Gauge("notesup_pending_writes", "Descriptions buffered for the next batched write",
+              func=lambda: db.summary_writer.pending())
+metrics.Gauge("notesup_llm_concurrency_limit", "Current adaptive limit on concurrent LLM calls",
+              func=lambda: llm.concurrency.limit)
+JOB_TIMINGS_PERSIST = os.getenv("JOB_TIMINGS_PERSIST", "0") == "1"
+
+def persist_timings(timings):
+    db.save_job_timings(timings.file_path, json.dumps(timings.as_dict()))
+
+db.summary_writer.on_flush(job_log.record_write)
+if JOB_TIMINGS_PERSIST:
+    job_log.add_listener(persist_timings)
+
+metrics.Gauge("notesup_ready", "Startup self-checks that passed (1) or failed (0)",
+              func=lambda: {name: int(ok) for name, ok in readiness.items()}, label="check")
+
+def clear_temp_folder():
+    """Clear temp folder with error handling"""
+    if os.path.exists(TEMP_DIR):
+        try:
+            shutil.rmtree(TEMP_DIR)
+            print(f"[✓] Cleared temp folder: {TEMP_DIR}")
+        except Exception as e:
+            print(f"[✗] Failed to clear temp folder: {e}")
+    
+    try:
+        os.makedirs(TEMP_DIR, exist_ok=True)
+    except Exception as e:
+        print(f"[✗] Failed to create temp folder: {e}")
+
+def claim_backlog():
+    """One keyset pass over the open jobs, keeping the pipeline topped up.
+
+    Returns the number of jobs claimed; stops early when the worker is
+    shutting down.
+    """
+    cursor = ''
+    claimed = 0
+    while not stop_event.is_set():
+        # Hold off while the pipeline already has enough work
+        while pipeline.in_flight >= BACKLOG_MAX_IN_FLIGHT and not stop_event.is_set():
+            time.sleep(0.5)
+
+        notes = db.claim_jobs(after=cursor, limit=BACKLOG_BATCH_SIZE)
+        if not notes:
+            break
+        with leases_lock:
+            leases.update(note.file_path for note in notes)
+        for note in notes:
+            pipeline.submit(DescriptionJob(note))
+        claimed += len(notes)
+        cursor = notes[-1].file_path
+    return claimed
+
+def sweep_null_notes():
+    """Add jobs for notes missing one; only the worker holding SWEEP_LOCK scans"""
+    with db.advisory_lock(SWEEP_LOCK, wait=False) as acquired:
+        if not acquired:
+            return None
+        added = db.enqueue_null_notes()
+        if added:
+            print(f"[✓] Sweep queued {added} notes")
+        return added
+
+def listen_for_uploads():
+    """Queue each new upload as soon as its insert is notified.
+
+    Every worker listens; they all try to claim the job and SKIP LOCKED
+    hands it to one of them. Reconnects after WORKER_LISTEN_RETRY seconds
+    if the listening connection drops.
+    """
+    while not stop_event.is_set():
+        try:
+            for file_paths in db.listen_for_uploads(timeout=WORKER_POLL_INTERVAL):
+                if stop_event.is_set():
+                    break
+                queued = [path for path in file_paths if db.enqueue_note(path)]
+                if queued:
+                    print(f"[✓] Queued {len(queued)} new uploads")
+                    wake()
+        except Exception as e:
+            print(f"Upload listener error: {e}")
+            stop_event.wait(WORKER_LISTEN_RETRY)
+
+def renew_leases():
+    """Keep claimed jobs leased to this worker while they wait in its pipeline.
+
+    Without this, a job queued locally for longer than CLAIM_LEASE_SECONDS
+    (LLM backoff, a deep backlog under the rate limit) would be re-claimed
+    and processed a second time.
+    """
+    while not stop_event.wait(db.LEASE_RENEW_SECONDS):
+        with leases_lock:
+            file_paths = list(leases)
+        db.renew_leases(file_paths)
+
+def check_readiness():
+    """Run the slower self-checks off the startup path"""
+    readiness["tesseract"] = test_tesseract()
+    if not readiness["tesseract"]:
+        print("Tesseract OCR is not properly installed or configured.")
+
+def start_readiness_check():
+    Thread(target=check_readiness, name="readiness-check", daemon=True).start()
+
+def wake():
+    """Make an idle worker loop poll now instead of at its next interval"""
+    wake_event.set()
+
+def stop(*_):
+    stop_event.set()
+    wake_event.set()
+
+def drain(timeout=WORKER_DRAIN_TIMEOUT):
+    """Wait for in-flight jobs, then flush buffered descriptions.
+
+    Jobs still running after the timeout keep their lease and are
+    re-claimed by another worker once it expires.
+    """
+    deadline = time.monotonic() + timeout
+    while pipeline.active and time.monotonic() < deadline:
+        time.sleep(0.2)
+    if pipeline.active:
+        print(f"[!] Stopping with {pipeline.in_flight} jobs still in flight")
+    db.summary_writer.flush()
+    if ocr is not None:
+        ocr.shutdown_ocr_executor()
+    office_pool.shutdown()
+
+def run_worker(concurrency=None):
+    """Claim and process jobs until stopped.
+
+    With `concurrency`, the download and extract stages each run that many
+    threads instead of DOWNLOAD_WORKERS/EXTRACT_WORKERS. Claims use SKIP
+    LOCKED, so workers on any number of hosts never share a job.
+    """
+    if concurrency:
+        for stage in pipeline.stages[:2]:
+            stage.workers = max(1, concurrency)
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+    start_worker_if_needed()
+    if db.STABLE_WORKER_ID:
+        # Resume what this worker held before a restart without waiting out the lease
+        released = db.release_worker_jobs()
+        if released:
+            print(f"[✓] Re-queued {released} jobs left in progress by {db.WORKER_ID}")
+    Thread(target=renew_leases, name="lease-renewer", daemon=True).start()
+    if WORKER_LISTEN:
+        Thread(target=listen_for_uploads, name="upload-listener", daemon=True).start()
+    print(f"[✓] Worker {db.WORKER_ID} started")
+    next_sweep = 0.0
+    while not stop_event.is_set():
+        try:
+            if time.monotonic() >= next_sweep:
+                sweep_null_notes()
+                next_sweep = time.monotonic() + WORKER_SWEEP_INTERVAL
+            claimed = claim_backlog()
+        except Exception as e:
+            print(f"Worker loop error: {e}")
+            claimed = 0
+        if not claimed:
+            wake_event.wait(WORKER_POLL_INTERVAL)
+            wake_event.clear()
+
+    drain()
+    print(f"[✓] Worker {db.WORKER_ID} stopped")
+
+def _int_param(params, name, default):
+    try:
+        return int(params.get(name, default))
+    except (TypeError, ValueError):
+        return None
+
+def jobs_route(method, params, headers):
+    """Stage timings of the most recent jobs, newest first"""
+    if not profiling.authorized(headers.get("X-Admin-Token")):
+        return 403, {"message": "Admin token required."}
+    limit = _int_param(params, "limit", 50)
+    if limit is None:
+        return 400, {"message": "limit must be an integer."}
+    return 200, {"jobs": job_log.recent(limit)}
+
+def profile_route(method, params, headers):
+    """POST ?jobs=N profiles the next N jobs; GET returns the session's results"""
+    if not profiling.authorized(headers.get("X-Admin-Token")):
+        return 403, {"message": "Admin token required."}
+    if method == "POST":
+        jobs = _int_param(params, "jobs", 10)
+        if jobs is None:
+            return 400, {"message": "jobs must be an integer."}
+        session = profiling.start_profile(jobs)
+        if session is None:
+            return 409, {"message": "A profiling session is already running."}
+        return 202, {"message": f"Profiling the next {session.jobs} jobs."}
+    results = profiling.profile_results()
+    if results is None:
+        return 404, {"message": "No profiling session has run yet."}
+    return 200, results
+
+ADMIN_ROUTES = {"/jobs": jobs_route, "/admin/profile": profile_route}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m worker_main",
+                                     description="Run a description worker")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="download and extract threads (default: DOWNLOAD_WORKERS/EXTRACT_WORKERS)")
+    parser.add_argument("--metrics-port", type=int, default=WORKER_METRICS_PORT,
+                        help="serve /metrics on this port; 0 disables")
+    args = parser.parse_args(argv)
+
+    # Workers sharing a host each spill into their own directory
+    global TEMP_DIR
+    TEMP_DIR = os.path.join(TEMP_DIR, f"worker-{os.getpid()}")
+    clear_temp_folder()
+
+    start_readiness_check()
+    if args.metrics_port:
+        try:
+            metrics.serve_metrics(args.metrics_port, routes=ADMIN_ROUTES)
+        except OSError as e:
+            # Another worker on this host already holds the port
+            print(f"[✗] Metrics not served on port {args.metrics_port}: {e}")
+    run_worker(args.concurrency)
@@ -0,0 +1,12 @@
+"""Entry point for a standalone description worker:
+
+    python -m worker_main [--concurrency N] [--metrics-port PORT]
+
+Kept to a bare import so the OCR pool's spawned processes, which re-import
+the main module, don't load the worker, Flask or the database layer.
+"""
+import sys
+
+if __name__ == "__main__":
+    import worker
+    worker.main(sys.argv[1:])